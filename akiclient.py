@@ -0,0 +1,343 @@
+# akiclient.py - akinator.Client and AsyncClient with the extras our apps need
+# Install: pip install akinator.py
+#
+# Both are built on akiprotocol.Game, which builds the requests and applies the
+# responses; the classes here only move bytes, and add nothing to a game's slots
+# but the session it is bound to (None while idle) and its policy. send() and send_async()
+# are the sync and async transports; akihub runs many async games at once.
+
+import struct
+import sys
+import time
+from typing import Literal
+
+from akinator.async_client import AsyncCloudScraper
+from cloudscraper import create_scraper
+
+from akiprotocol import Game, GameState, HistoryDiverged  # noqa: F401 (HistoryDiverged is re-exported)
+from upstream_policy import DEFAULT_POLICY
+import akiparse
+import metrics
+
+# Size of the chunks the /game and /choice pages are scanned in as they arrive
+CHUNK_SIZE = 16384
+
+STATE_VERSION = 1
+
+metrics.Gauge('aki_charset_detections_total', 'akinator.com page fields that were not valid UTF-8.',
+              lambda: akiparse.decode_failures, kind='counter')
+
+# Every instance attribute of akinator.Client except the transport, in wire order
+_STRING_FIELDS = (
+    'language', 'theme', 'session_id', 'signature', 'identifiant', 'question',
+    'proposition', 'completion', 'akitude', 'id_proposition', 'name_proposition',
+    'description_proposition', 'pseudo', 'photo', 'flag_photo',
+)
+
+# Shared by most games, so rehydrated ones don't each carry a copy
+_INTERNED_FIELDS = frozenset(('language', 'theme', 'question', 'proposition', 'completion', 'akitude'))
+_HEADER = struct.Struct('>2sBBhhd')  # magic, version, flags, step, step_last_proposition, progression
+_MASK = struct.Struct('>H')
+_MAGIC = b'AK'
+
+_CHILD_MODE, _FINISHED, _WIN, _NO_STEP, _NO_PROGRESSION = 1, 2, 4, 8, 16
+
+
+def _write_varint(out, value):
+    while value > 0x7f:
+        out.append((value & 0x7f) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def _read_varint(data, offset):
+    value = shift = 0
+    while True:
+        byte = data[offset]
+        offset += 1
+        value |= (byte & 0x7f) << shift
+        if byte < 0x80:
+            return value, offset
+        shift += 7
+
+
+def send(game, request, session, policy=DEFAULT_POLICY):
+    """
+    Sync transport: sends `request` on a requests/cloudscraper `session` and applies
+    the response to `game`, timed by phase into `metrics`.
+    """
+    with metrics.upstream(request.call):
+        try:
+            with policy.post(session, request.url, data=request.data, stream=request.stream) as response:
+                metrics.response(response)
+                if request.stream:
+                    # The pages are scanned as they arrive, and left unread past the last field
+                    game.receive(request, response.status_code, response.iter_content(CHUNK_SIZE))
+                else:
+                    content = response.content
+                    start = time.perf_counter()
+                    game.receive(request, response.status_code, content)
+                    metrics.phase("parse", time.perf_counter() - start)
+        except Exception as e:
+            game.failed(request, e)
+
+
+async def send_async(game, request, session, policy=DEFAULT_POLICY):
+    """
+    Async transport: same as `send()` on an `AsyncCloudScraper` or
+    `async_transport.AsyncSession`.
+    """
+    try:
+        response = await policy.post_async(session, request.url, data=request.data)
+        game.receive(request, response.status_code, response.content)
+    except Exception as e:
+        game.failed(request, e)
+
+
+class Client(Game):
+    """
+    `akinator.Client` that can be frozen to bytes and rehydrated on another request.
+
+    Rehydrating skips `__init__`, so no scraper is built; pass a shared one as `session`.
+    The /game and /choice pages are scraped with `akiparse` straight from the response
+    bytes as they stream in, instead of decoding the page and running a regex per field.
+    Every akinator.com call is timed by phase into `metrics`, and sent with the
+    timeouts and retries of `policy` (an `upstream_policy.UpstreamPolicy`).
+    `back()` is answered from `history` when it can; see `sync()`.
+    """
+
+    __slots__ = ('session', 'policy')
+
+    def __init__(self, session=None, policy=None):
+        super().__init__()
+        self.session = session if session else create_scraper()
+        self.policy = DEFAULT_POLICY if policy is None else policy
+
+    def _send(self, request):
+        send(self, request, self.session, self.policy)
+
+    def start_game(self, *, language: str = "en", child_mode: bool = False, theme: Literal["c", "a", "o"] = "c"):
+        """
+        Starts a new game session with the specified language, child mode, and theme.
+
+        :param language: The language to use for the game. Defaults to "en" (English).
+        :type language: str
+        :param child_mode: Whether to enable child mode. Defaults to False.
+        :type child_mode: bool
+        :param theme: The theme to use for the game. Can be "c" (characters), "a" (animals), or "o" (objects). Defaults to "c".
+        :type theme: Literal["c", "a", "o"]
+        """
+        self._send(self.start_request(language=language, child_mode=child_mode, theme=theme))
+        return self.session
+
+    def answer(self, answer: str):
+        """
+        Submits an answer to the current question.
+
+        :param answer: The answer to submit. Can be "yes", "no", "i don't know", "probably", or "probably not".
+        :type answer: str
+        """
+        self.sync()
+        request = self.answer_request(answer)
+        if request is not None:
+            self._send(request)
+
+    def back(self):
+        """
+        Goes back to the previous question in the game.
+
+        When `history` has the previous question it is shown at once, and the
+        /cancel_answer call is left to `sync()`; otherwise this waits on akinator.com.
+        """
+        if not self.can_back_locally:
+            self.sync()
+        request = self.back_request()
+        if request is not None:
+            self._send(request)
+
+    def sync(self):
+        """
+        Sends the /cancel_answer calls `back()` answered from history, in order.
+
+        Every other call does this first; call it directly to reconcile in the background.
+        Raises `HistoryDiverged` if akinator.com did not end up where `back()` said.
+        """
+        request = self.pending_request()
+        while request is not None:
+            self._send(request)
+            request = self.pending_request()
+
+    def exclude(self):
+        """
+        Excludes the current proposition from the game.
+        """
+        self.sync()
+        request = self.exclude_request()
+        if request is not None:
+            self._send(request)
+
+    def choose(self):
+        """
+        Chooses the current proposition as the answer to the game.
+
+        .. note::
+
+            This method can only be called after Akinator has proposed a win. If the game is already finished, it will raise a `RuntimeError`.
+        """
+        self.sync()
+        self._send(self.choose_request())
+
+    def __getstate__(self):
+        # Pickled without its transport, like to_state(), but keeping history
+        return {name: getattr(self, name) for name in GameState.FIELDS}
+
+    def __setstate__(self, state):
+        for name, value in state.items():
+            self._load_field(name, value)
+        for field in _INTERNED_FIELDS:
+            value = getattr(self, field)
+            if value is not None:
+                self._load_field(field, sys.intern(value))
+        self.session = None
+        self.policy = DEFAULT_POLICY
+
+    def to_state(self) -> bytes:
+        """
+        Returns a compact, versioned binary snapshot of the game state (everything but the transport).
+
+        `history` is not kept, and neither are calls queued by `back()`: `sync()` them first.
+        """
+        if self.pending:
+            raise RuntimeError('Game has unsent /cancel_answer calls; sync() before to_state().')
+        flags = ((_CHILD_MODE if self.child_mode else 0) | (_FINISHED if self.finished else 0)
+                 | (_WIN if self.win else 0) | (_NO_STEP if self.step is None else 0)
+                 | (_NO_PROGRESSION if self.progression is None else 0))
+        step_last = self.step_last_proposition
+        out = bytearray(_HEADER.pack(
+            _MAGIC, STATE_VERSION, flags,
+            self.step or 0,
+            -1 if step_last in ('', None) else int(step_last),
+            self.progression or 0.0,
+        ))
+        mask = 0
+        values = []
+        for bit, field in enumerate(_STRING_FIELDS):
+            value = getattr(self, field)
+            if value is None:
+                mask |= 1 << bit
+            else:
+                values.append(str(value).encode())
+        out += _MASK.pack(mask)
+        for value in values:
+            _write_varint(out, len(value))
+            out += value
+        return bytes(out)
+
+    @classmethod
+    def from_state(cls, state: bytes, session=None):
+        """
+        Rebuilds a client from `to_state()` output without creating a new scraper.
+
+        :param state: Bytes produced by `to_state()`.
+        :param session: The `CloudScraper` to use for further requests, usually a pooled one.
+        """
+        magic, version, flags, step, step_last, progression = _HEADER.unpack_from(state)
+        if magic != _MAGIC or version != STATE_VERSION:
+            raise ValueError(f'Unsupported game state (version {version}).')
+        (mask,), offset = _MASK.unpack_from(state, _HEADER.size), _HEADER.size + _MASK.size
+
+        self = cls.__new__(cls)
+        GameState.__init__(self)
+        self.session = session
+        self.policy = DEFAULT_POLICY
+        self._load_field('child_mode', bool(flags & _CHILD_MODE))
+        self.finished = bool(flags & _FINISHED)
+        self.win = bool(flags & _WIN)
+        self.step = None if flags & _NO_STEP else step
+        self.progression = None if flags & _NO_PROGRESSION else progression
+        self.step_last_proposition = '' if step_last < 0 else step_last
+        for bit, field in enumerate(_STRING_FIELDS):
+            if mask & (1 << bit):
+                value = None
+            else:
+                size, offset = _read_varint(state, offset)
+                value = state[offset:offset + size].decode()
+                offset += size
+                if field in _INTERNED_FIELDS:
+                    value = sys.intern(value)
+            self._load_field(field, value)
+        return self
+
+
+
+class Akinator(Client):
+    """
+    Same as `Client`, mirroring `akinator.Akinator`.
+    """
+
+    __slots__ = ()
+
+
+class AsyncClient(Game):
+    """
+    `akinator.AsyncClient` whose calls are sent with the timeouts and retries of
+    `policy`. Works with `AsyncCloudScraper` and with `async_transport.AsyncSession`.
+    Keeps the same `history` as `Client`.
+    """
+
+    __slots__ = ('session', 'policy')
+
+    def __init__(self, session=None, policy=None):
+        super().__init__()
+        self.session = session if session else AsyncCloudScraper()
+        self.policy = DEFAULT_POLICY if policy is None else policy
+
+    async def _send(self, request):
+        await send_async(self, request, self.session, self.policy)
+
+    async def start_game(self, *, language: str = "en", child_mode: bool = False, theme: Literal["c", "a", "o"] = "c"):
+        """Same as `Client.start_game()`."""
+        await self._send(self.start_request(language=language, child_mode=child_mode, theme=theme))
+        return self.session
+
+    async def answer(self, answer: str):
+        """Same as `Client.answer()`."""
+        await self.sync()
+        request = self.answer_request(answer)
+        if request is not None:
+            await self._send(request)
+
+    async def back(self):
+        """Same as `Client.back()`: no await on akinator.com when `history` has the previous question."""
+        if not self.can_back_locally:
+            await self.sync()
+        request = self.back_request()
+        if request is not None:
+            await self._send(request)
+
+    async def sync(self):
+        """Same as `Client.sync()`."""
+        request = self.pending_request()
+        while request is not None:
+            await self._send(request)
+            request = self.pending_request()
+
+    async def exclude(self):
+        """Same as `Client.exclude()`."""
+        await self.sync()
+        request = self.exclude_request()
+        if request is not None:
+            await self._send(request)
+
+    async def choose(self):
+        """Same as `Client.choose()`."""
+        await self.sync()
+        await self._send(self.choose_request())
+
+
+class AsyncAkinator(AsyncClient):
+    """
+    Same as `AsyncClient`, mirroring `akinator.AsyncAkinator`.
+    """
+
+    __slots__ = ()
@@ -0,0 +1,186 @@
+# akihub.py - Many AsyncAkinator games in one process, on shared transports
+# A bare AsyncClient() builds its own AsyncCloudScraper: its own user agent, TLS
+# context and connections. AkinatorHub builds those once, for every game it runs: the
+# AsyncConnectionPool, one session per language (akinator.com tells games apart by
+# session/signature, not cookies), a semaphore per host bounding the calls in flight,
+# and the registry of games by id. What is left per game is its slotted GameState and
+# a lock. start_many() and answer_many() send independent games' calls together over
+# the pool's keep-alive connections.
+#
+# Usage:
+#     hub = AkinatorHub()
+#     session_ids = await hub.start_many(100, language='en')
+#     client = await hub.answer(session_ids[0], 'y')
+#     hub.close(session_ids[0])
+
+import asyncio
+import uuid
+
+from akinator.client import LANG_MAP
+
+from akiclient import AsyncAkinator, HistoryDiverged
+from async_transport import AsyncConnectionPool
+from session_store import MemorySessionStore
+
+
+class UnknownGame(LookupError):
+    """No game has that id: it was never started, was closed, or sat idle past the hub's `ttl`."""
+
+
+class AkinatorHub:
+    """
+    Runs `AsyncAkinator` games on one connection pool, by session id.
+
+    Calls on one game go out one at a time, in order; calls on different games run
+    concurrently, up to `max_per_host` per akinator.com host. A `back()` answered from
+    the game's history is confirmed with akinator.com in the background.
+
+    :param pool: The `AsyncConnectionPool` every game is sent over; one is created if None.
+    :param max_per_host: Calls in flight per host, retries included.
+    :param ttl: Seconds a game may sit idle before it is dropped.
+    :param max_games: Games kept at most; the least recently used are dropped first.
+    :param policy: The `UpstreamPolicy` of every game; `upstream_policy.DEFAULT_POLICY` if None.
+    :param upstream: Base URL the created pool sends everything to instead, for load tests.
+    :param http2: Have the created pool multiplex games over HTTP/2 where akinator.com offers it.
+    """
+
+    def __init__(self, pool=None, max_per_host=32, ttl=900, max_games=10000, policy=None, upstream=None,
+                 http2=False):
+        if pool is None:
+            pool = AsyncConnectionPool(max_per_host=max_per_host, upstream=upstream, http2=http2)
+        self.pool = pool
+        self.max_per_host = max_per_host
+        self.policy = policy
+        self.games = MemorySessionStore(ttl=ttl, max_size=max_games)
+        self._sessions = {}       # language -> AsyncSession
+        self._limits = {}         # language -> asyncio.Semaphore
+        self._reconciling = set()
+
+    def _session(self, language):
+        session = self._sessions.get(language)
+        if session is None:
+            session = self._sessions[language] = self.pool.session()
+        return session
+
+    def _limit(self, language):
+        limit = self._limits.get(language)
+        if limit is None:
+            limit = self._limits[language] = asyncio.Semaphore(self.max_per_host)
+        return limit
+
+    def _entry(self, session_id):
+        entry = self.games.get(session_id) if session_id else None
+        if entry is None:
+            raise UnknownGame(session_id)
+        return entry
+
+    def get(self, session_id):
+        """The `AsyncAkinator` of a game, or None."""
+        entry = self.games.get(session_id) if session_id else None
+        return entry['client'] if entry is not None else None
+
+    def info(self, session_id):
+        """What was passed as `info` when the game was started."""
+        return self._entry(session_id)['info']
+
+    async def start(self, language='en', theme='c', child_mode=False, info=None):
+        """Start a game and return its session id."""
+        language = LANG_MAP.get(language.lower(), language.lower())
+        client = AsyncAkinator(session=self._session(language), policy=self.policy)
+        async with self._limit(language):
+            await client.start_game(language=language, theme=theme, child_mode=child_mode)
+        session_id = str(uuid.uuid4())
+        self.games.set(session_id, {'client': client, 'lock': asyncio.Lock(), 'info': info})
+        return session_id
+
+    async def start_many(self, count, language='en', theme='c', child_mode=False):
+        """
+        Start `count` games at once and return the ids of those that started.
+
+        Raises the first error if none did.
+        """
+        results = await asyncio.gather(*(self.start(language, theme, child_mode) for _ in range(count)),
+                                       return_exceptions=True)
+        started = [result for result in results if not isinstance(result, BaseException)]
+        if results and not started:
+            raise results[0]
+        return started
+
+    async def _call(self, session_id, method, *args):
+        entry = self._entry(session_id)
+        client = entry['client']
+        async with entry['lock']:
+            # A background confirmation found akinator.com elsewhere; tell this call
+            error = entry.pop('diverged', None)
+            if error is not None:
+                raise error
+            async with self._limit(client.pool_key):
+                await getattr(client, method)(*args)
+        return client
+
+    async def answer(self, session_id, answer):
+        """`AsyncClient.answer()` on a game; returns its `AsyncAkinator`."""
+        return await self._call(session_id, 'answer', answer)
+
+    async def answer_many(self, answers):
+        """
+        Answer many games at once, from a `{session_id: answer}` mapping.
+
+        Returns `{session_id: exception or None}`.
+        """
+        results = await asyncio.gather(*(self.answer(session_id, answer) for session_id, answer in answers.items()),
+                                       return_exceptions=True)
+        return {session_id: result if isinstance(result, BaseException) else None
+                for session_id, result in zip(answers, results)}
+
+    async def back(self, session_id):
+        """`AsyncClient.back()` on a game; returns its `AsyncAkinator`."""
+        entry = self._entry(session_id)
+        client = entry['client']
+        async with entry['lock']:
+            error = entry.pop('diverged', None)
+            if error is not None:
+                raise error
+            if client.can_back_locally:
+                await client.back()
+            else:
+                async with self._limit(client.pool_key):
+                    await client.back()
+        if client.pending:
+            task = asyncio.create_task(self._reconcile(entry))
+            self._reconciling.add(task)
+            task.add_done_callback(self._reconciling.discard)
+        return client
+
+    async def exclude(self, session_id):
+        """`AsyncClient.exclude()` on a game; returns its `AsyncAkinator`."""
+        return await self._call(session_id, 'exclude')
+
+    async def choose(self, session_id):
+        """`AsyncClient.choose()` on a game; returns its `AsyncAkinator`."""
+        return await self._call(session_id, 'choose')
+
+    async def _reconcile(self, entry):
+        async with entry['lock']:
+            client = entry['client']
+            try:
+                async with self._limit(client.pool_key):
+                    await client.sync()
+            except HistoryDiverged as e:
+                entry['diverged'] = e
+            except Exception:
+                # Still queued; the game's next call sends it first
+                pass
+
+    def close(self, session_id):
+        """Forget a game; False if there was none. akinator.com has nothing to be told."""
+        return self.games.delete(session_id) is not None
+
+    async def aclose(self):
+        """Wait for background confirmations, then close the pool's connections."""
+        if self._reconciling:
+            await asyncio.gather(*self._reconciling, return_exceptions=True)
+        await self.pool.close()
+
+    def __len__(self):
+        return len(self.games)
@@ -0,0 +1,117 @@
+# akiparse.py - Fast extractor for the akinator.com /game and /choice pages
+# Works on the raw response bytes (no decode of the whole page): each field is located
+# with bytes.find() on its literal prefix and its compiled pattern is matched only at
+# that spot. Fields already found are not searched again, and HtmlExtractor.feed()
+# lets the search run on chunks as they arrive from the socket; extract_stream()
+# stops reading once every field is found.
+#
+# A single alternation regex over all fields was tried first; CPython's re can't use
+# its literal-prefix fast path for alternations, and it was ~75x slower on a 300 KB page.
+
+import re
+from html import unescape
+
+# Same patterns akinator.Client uses, as bytes, keyed by the literal text each one
+# starts with. `[\w\s]+` becomes `[^<]+` / `[^"]+` because bytes patterns only know
+# ASCII `\w` and would miss accented propositions.
+PATTERNS = {
+    'session': (b"#session'", rb"#session'\)\.val\('(?P<session>.+?)'\)"),
+    'signature': (b"#signature'", rb"#signature'\)\.val\('(?P<signature>.+?)'\)"),
+    'identifiant': (b"#identifiant'", rb"#identifiant'\)\.val\('(?P<identifiant>.+?)'\)"),
+    'question': (b'<div class="bubble-body"><p class="question-text" id="question-label">',
+                 rb'<div class="bubble-body"><p class="question-text" id="question-label">(?P<question>.+)</p></div>'),
+    'proposition': (b'<div class="sub-bubble-propose"><p id="p-sub-bubble">',
+                    rb'<div class="sub-bubble-propose"><p id="p-sub-bubble">(?P<proposition>[^<]+)</p></div>'),
+    'win_sentence': (b'<span class="win-sentence">', rb'<span class="win-sentence">(?P<win_sentence>.+?)</span>'),
+    'already_played': (b'let tokenDejaJoue = "', rb'let tokenDejaJoue = "(?P<already_played>[^"]+)";'),
+    'times_selected': (b'let timesSelected = "', rb'let timesSelected = "(?P<times_selected>\d+)";'),
+    'times': (b'<span id="timesselected"></span>', rb'<span id="timesselected"></span>\s+(?P<times>[^<]+)</span>'),
+}
+
+GAME_FIELDS = ('session', 'signature', 'identifiant', 'question', 'proposition')
+CHOICE_FIELDS = ('win_sentence', 'already_played', 'times_selected', 'times')
+
+FIELDS = {name: (anchor, re.compile(pattern)) for name, (anchor, pattern) in PATTERNS.items()}
+
+# Fields that were not valid UTF-8 and were decoded with replacement characters. The
+# pages are UTF-8 whatever they declare; a count here means one wasn't (akiclient
+# exports it on /metrics)
+decode_failures = 0
+
+# How much already-scanned text is rescanned with the next chunk, for fields whose
+# pattern spans a line break
+_OVERLAP = 1024
+
+
+class HtmlExtractor:
+    """
+    Incrementally pulls the akinator fields out of an HTML page.
+
+    Only complete lines are scanned, so a field is never captured from a truncated
+    chunk. The first occurrence of each field wins.
+    """
+
+    def __init__(self, fields=GAME_FIELDS + CHOICE_FIELDS):
+        self.wanted = set(fields)
+        self.found = {}
+        self._buffer = bytearray()
+        self._scanned = 0  # offset in _buffer up to which complete lines were scanned
+
+    @property
+    def done(self):
+        return self.wanted.issubset(self.found)
+
+    def feed(self, chunk):
+        # Extended in place and searched for a line end in the new chunk only, so a page
+        # without newlines costs linear time, not a copy and a rescan per chunk
+        self._buffer += chunk
+        end = self._buffer.rfind(b'\n', len(self._buffer) - len(chunk)) + 1
+        if end > self._scanned:
+            self._scan(end)
+            # Keep an overlap before the scanned point for multi-line patterns
+            keep = max(0, self._buffer.rfind(b'\n', 0, max(0, end - _OVERLAP)) + 1)
+            del self._buffer[:keep]
+            self._scanned = end - keep
+
+    def close(self):
+        """Scan whatever is left and return the decoded fields."""
+        if len(self._buffer) > self._scanned:
+            self._scan(len(self._buffer))
+        self._buffer.clear()
+        return {name: unescape(_decode(value)) for name, value in self.found.items()}
+
+    def _scan(self, end):
+        buffer = self._buffer
+        start = max(0, buffer.rfind(b'\n', 0, max(0, self._scanned - _OVERLAP)) + 1) if self._scanned else 0
+        for name in self.wanted.difference(self.found):
+            anchor, pattern = FIELDS[name]
+            position = buffer.find(anchor, start, end)
+            while position >= 0:
+                match = pattern.match(buffer, position, end)
+                if match:
+                    self.found[name] = match.group(name)
+                    break
+                position = buffer.find(anchor, position + 1, end)
+
+
+def _decode(value):
+    global decode_failures
+    try:
+        return value.decode('utf-8')
+    except UnicodeDecodeError:
+        decode_failures += 1
+        return value.decode('utf-8', 'replace')
+
+
+def extract_stream(chunks, fields=GAME_FIELDS + CHOICE_FIELDS):
+    """
+    Extract fields from an iterable of byte chunks, e.g. `response.iter_content()`.
+
+    The chunks after the one completing the last field are not read.
+    """
+    extractor = HtmlExtractor(fields)
+    for chunk in chunks:
+        extractor.feed(chunk)
+        if extractor.done:
+            break
+    return extractor.close()
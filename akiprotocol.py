@@ -0,0 +1,497 @@
+# akiprotocol.py - The akinator.com game protocol, without any I/O
+# akinator.Client and akinator.AsyncClient are near-copies of each other: both build
+# the same form posts and run the same response state machine, each tied to its own
+# transport. Game holds the game state once: its *_request() methods return the
+# Request to send and receive() applies the response bytes to the state. akiclient's
+# sync and async transports are thin loops around it. A mock or pipelined
+# transport can drive it with plain bytes.
+
+import json
+import operator
+import sys
+
+from akinator.client import ANSWER_MAP, LANG_MAP, THEME_IDS, THEME_MAP
+from akinator.exceptions import CantGoBackAnyFurther, InvalidChoiceError, InvalidLanguageError, InvalidThemeError
+
+from akiparse import CHOICE_FIELDS, GAME_FIELDS, extract_stream
+
+# Shown by defeat(), as akinator.Client has them
+DEFEAT_QUESTIONS = {
+    "en": "Bravo, you have defeated me !\nShare your feat with your friends.",
+    "ar": "أحسنت، لقد هزمتني !\nشارك إنجازك مع أصدقائك.",
+    "cn": "太棒了，你打败了我！\n与朋友分享你的成就吧。",
+    "de": "Bravo, du hast mich besiegt !\nTeile deinen Erfolg mit deinen Freunden.",
+    "es": "¡Bravo, me has derrotado !\nComparte tu hazaña con tus amigos.",
+    "fr": "Bravo, tu m'as vaincu  !\nPartage ton exploit avec tes amis.",
+    "il": "כל הכבוד, הצלחת להביס אותי !\nשתף את ההישג שלך עם חברים.",
+    "it": "Bravo, mi hai sconfitto !\nCondividi la tua impresa con i tuoi amici.",
+    "jp": "すごい、あなたは私を倒しました！\nこの偉業を友達と共有しましょう。",
+    "kr": "브라보, 당신이 저를 이겼습니다 !\n당신의 업적을 친구들과 공유하세요.",
+    "nl": "Bravo, je hebt me verslagen !\nDeel je prestatie met je vrienden.",
+    "pl": "Brawo, pokonałeś mnie !\nPodziel się swoim wyczynem ze znajomymi.",
+    "pt": "Bravo, você me derrotou !\nCompartilhe sua conquista com seus amigos.",
+    "ru": "Браво, ты победил меня !\nПоделись своим достижением с друзьями.",
+    "tr": "Bravo, beni yendin !\nBu başarını arkadaşlarınla paylaş.",
+    "id": "Hebat, kamu mengalahkanku !\nBagikan pencapaianmu kepada teman-temanmu.",
+}
+
+# Request.kind -> the `metrics` call name it is timed as
+CALLS = {'start': 'start_game', 'answer': 'answer', 'cancel': 'back', 'exclude': 'exclude', 'choice': 'choose'}
+
+
+class HistoryDiverged(RuntimeError):
+    """
+    akinator.com is not on the question `back()` showed from history: it went back to
+    a different one, or the /cancel_answer call failed. The game now holds
+    akinator.com's state, as `client`.
+    """
+
+    def __init__(self, client, message):
+        super().__init__(message)
+        self.client = client
+
+
+class Request:
+    """
+    One form POST to akinator.com. Send `data` to `url`, then hand the response status
+    and body to `Game.receive()`, or the exception to `Game.failed()`.
+
+    :ivar kind: "start", "answer", "cancel", "exclude" or "choice".
+    :ivar stream: True for the HTML pages, whose body `receive()` can scan in chunks.
+    :ivar target: For a /cancel_answer queued by `Game.back_request()`, the state it should land on.
+    """
+
+    __slots__ = ('kind', 'url', 'data', 'error', 'target')
+
+    def __init__(self, kind, url, data, error, target=None):
+        self.kind = kind
+        self.url = url
+        self.data = data
+        self.error = error
+        self.target = target
+
+    @property
+    def stream(self):
+        return self.kind in ('start', 'choice')
+
+    @property
+    def call(self):
+        return CALLS[self.kind]
+
+    def __repr__(self):
+        return f'<Request {self.kind} {self.url}>'
+
+
+# Set when a game starts and never changed by it: read-only attributes of GameState
+FIXED_FIELDS = ('language', 'theme', 'child_mode', 'session_id', 'signature', 'identifiant')
+
+
+def _fixed(name):
+    return property(operator.attrgetter('_' + name), doc=f'`{name}` of the game; set when it starts.')
+
+
+class GameState:
+    """
+    The protocol fields of one game, with the same names as `akinator.Client`'s
+    attributes, and nothing else. There is no `__dict__` and no transport: a game is
+    sent through whichever session the pool hands out for its `pool_key`. Language,
+    theme, akitude, questions and the other strings many games share are interned,
+    and `history` and the queued /cancel_answer calls stay None until a game needs them.
+
+    The `FIXED_FIELDS` are read-only: starting a game sets them, and `_load_field()` when a
+    stored one is rebuilt. The rest move with every answer.
+    """
+
+    __slots__ = (
+        '_language', '_theme', '_child_mode', '_session_id', '_signature', '_identifiant',
+        'question', 'progression', 'step', 'akitude', 'step_last_proposition', 'finished',
+        'win', 'id_proposition', 'name_proposition', 'description_proposition', 'proposition',
+        'completion', 'pseudo', 'photo', 'flag_photo', 'history', '_pending',
+    )
+
+    # Every field by its public name, in slot order
+    FIELDS = FIXED_FIELDS + __slots__[len(FIXED_FIELDS):]
+
+    language = _fixed('language')
+    theme = _fixed('theme')
+    child_mode = _fixed('child_mode')
+    session_id = _fixed('session_id')
+    signature = _fixed('signature')
+    identifiant = _fixed('identifiant')
+
+    def __init__(self):
+        self.flag_photo = None
+        self.photo = None
+        self.pseudo = None
+        self._theme = None
+        self._session_id = None
+        self._signature = None
+        self._identifiant = None
+        self._child_mode = False
+        self._language = None
+
+        self.question = None
+        self.progression = None
+        self.step = None
+        self.akitude = None
+        self.step_last_proposition = ""
+        self.finished = False
+
+        self.win = False
+        self.id_proposition = None
+        self.name_proposition = None
+        self.description_proposition = None
+        self.proposition = ""
+        self.completion = None
+
+        self.history = None
+        self._pending = None
+
+    @property
+    def pool_key(self):
+        """The key transports for this game are pooled by (akinator.com is one host per language)."""
+        return self._language
+
+    def _load_field(self, name, value):
+        # Sets any field by its public name, read-only ones included, for a stored game
+        setattr(self, '_' + name if name in FIXED_FIELDS else name, value)
+
+
+class Game(GameState):
+    """
+    `GameState` with the protocol: requests out, responses in.
+
+    Every question answered is pushed onto `history` as (step, progression, question,
+    akitude), so `back_request()` can show the previous one at once and queue the
+    /cancel_answer call it stands for; `pending_request()` hands those out in order.
+    """
+
+    __slots__ = ()
+
+    def _url(self, path):
+        return f"https://{self.language}.akinator.com/{path}"
+
+    def _form(self, **extra):
+        return {
+            "step": self.step,
+            "progression": self.progression,
+            "sid": THEME_IDS[self.theme],
+            "cm": str(self.child_mode).lower(),
+            **extra,
+            "session": self.session_id,
+            "signature": self.signature
+        }
+
+    def _check_synced(self):
+        if self.pending:
+            raise RuntimeError("Send the queued /cancel_answer calls (pending_request()) first.")
+
+    def start_request(self, *, language="en", child_mode=False, theme="c"):
+        """The request that starts a new game; raises if the language or theme is not supported."""
+        if language not in LANG_MAP and language not in LANG_MAP.values():
+            raise InvalidLanguageError(f"Unsupported language: {language}. Supported languages: {', '.join(LANG_MAP.keys())}")
+
+        if theme not in THEME_IDS and theme not in THEME_IDS.values():
+            raise InvalidThemeError(f"Unsupported theme: {theme}. Supported themes: {', '.join(THEME_IDS.keys())}")
+
+        if theme not in THEME_MAP[LANG_MAP.get(language.lower(), language.lower())]:
+            raise InvalidThemeError(f"Theme '{theme}' is not available for language '{language}'.")
+
+        self._theme = sys.intern(theme)
+        self._language = sys.intern(LANG_MAP.get(language.lower(), language.lower()))
+        self._child_mode = child_mode
+        return Request("start", self._url("game"), {"sid": THEME_IDS[theme], "cm": str(child_mode).lower()},
+                       "Failed to start the game.")
+
+    def answer_request(self, answer):
+        """
+        The request for an answer to the current question; after a proposition, "yes"
+        chooses it and "no" excludes it. None if nothing needs sending.
+        """
+        self._check_synced()
+        if not answer.lower() in ANSWER_MAP:
+            raise InvalidChoiceError(f"Invalid answer: {answer}. Valid answers are: {', '.join(ANSWER_MAP.keys())}")
+        answer_id = ANSWER_MAP[answer.lower()]
+
+        if self.win:
+            if answer_id == 0:
+                return self.choose_request()
+            if answer_id == 1:
+                return self.exclude_request()
+            raise InvalidChoiceError("Invalid answer after Akinator has proposed a win. Only 'yes' or 'no' are valid answers at this point.")
+
+        self._remember()
+        data = self._form(answer=answer_id, step_last_proposition=self.step_last_proposition)
+        return Request("answer", self._url("answer"), data, "Failed to submit the answer.")
+
+    def back_request(self):
+        """
+        Goes back a question. Answered from `history` when it has the previous question:
+        the state moves at once, the /cancel_answer call is queued for
+        `pending_request()` and None is returned. Otherwise returns the call to wait on.
+        """
+        if self.step == 0:
+            raise CantGoBackAnyFurther()
+        target = self._previous()
+        if target is None:
+            self._check_synced()
+            data = self._form()
+            self.win = False
+            return Request("cancel", self._url("cancel_answer"), data, "Failed to go back to the previous question.")
+
+        history = self.history
+        while history and history[-1][0] >= target[0]:
+            history.pop()
+        request = Request("cancel", self._url("cancel_answer"), self._form(),
+                          "Failed to go back to the previous question.", target)
+        if self._pending is None:
+            self._pending = []
+        self._pending.append((request, self._snapshot(), self.win))
+        self._restore(target)
+        self.win = False
+        return None
+
+    def exclude_request(self):
+        """The request that excludes the current proposition; None if the game is over and was lost."""
+        self._check_synced()
+        if not self.win:
+            raise RuntimeError("You can only exclude a proposition after Akinator has proposed a win.")
+
+        if self.finished:
+            return self.defeat()
+
+        self._remember()
+        data = self._form()
+        data["step"] = self.step + 1
+        data["forward_answer"] = 1
+        self.win = False
+        self.id_proposition = ""
+        return Request("exclude", self._url("exclude"), data, "Failed to exclude the proposition.")
+
+    def choose_request(self):
+        """The request that chooses the current proposition as the answer."""
+        self._check_synced()
+        if not self.win:
+            raise RuntimeError("You can only choose a proposition after Akinator has proposed a win.")
+
+        data = {
+            "step": self.step,
+            "sid": THEME_IDS[self.theme],
+            "session": self.session_id,
+            "signature": self.signature,
+            "identifiant": self.identifiant,
+            "pid": self.id_proposition,
+            "charac_name": self.name_proposition,
+            "charac_description": self.description_proposition,
+            "pflag_photo": self.flag_photo
+        }
+        return Request("choice", self._url("choice"), data, "Failed to choose the proposition.")
+
+    def pending_request(self):
+        """The first /cancel_answer call queued by `back_request()`, or None."""
+        return self._pending[0][0] if self._pending else None
+
+    @property
+    def pending(self):
+        """Number of /cancel_answer calls queued by `back_request()`."""
+        return len(self._pending) if self._pending else 0
+
+    @property
+    def can_back_locally(self):
+        """True if `back_request()` can be answered from history without waiting on akinator.com."""
+        return bool(self.step) and self._previous() is not None
+
+    def receive(self, request, status, content):
+        """
+        Applies akinator.com's response to `request`.
+
+        :param status: The HTTP status.
+        :param content: The body, as bytes or, for `request.stream`, an iterable of chunks.
+        """
+        if isinstance(content, (bytes, bytearray)):
+            content = (content,)
+        if request.kind == "start":
+            self._started(status, content)
+        elif request.kind == "choice":
+            self._chosen(status, content)
+        else:
+            if not 200 <= status < 300:
+                raise ValueError(f"akinator.com answered {status}.")
+            self._handle(b"".join(content))
+            if request.target is not None:
+                self._cancelled(request.target)
+
+    def failed(self, request, error):
+        """Raises what the caller of `request` should see, after sending or `receive()` raised `error`."""
+        if isinstance(error, HistoryDiverged):
+            raise error
+        if request.target is not None:
+            self._cancel_failed(error)
+        raise RuntimeError(request.error) from error
+
+    def _started(self, status, chunks):
+        if not 200 <= status < 300:
+            raise ValueError(f"akinator.com answered {status}.")
+        fields = extract_stream(chunks, GAME_FIELDS)
+
+        self._session_id = fields.get("session")
+        self._signature = fields.get("signature")
+        self._identifiant = fields.get("identifiant")
+
+        if not all([self.session_id, self.signature, self.identifiant]):
+            raise ValueError("Failed to extract session information from the response.")
+
+        if "question" not in fields:
+            raise ValueError("Failed to extract the initial question from the response.")
+
+        self.question = sys.intern(fields["question"])
+
+        if "proposition" not in fields:
+            raise ValueError("Failed to extract the proposition from the response.")
+
+        self.proposition = sys.intern(fields["proposition"])
+        self.progression = 0
+        self.step = 0
+        self.akitude = "defi.png"
+
+    def _chosen(self, status, chunks):
+        if not 200 <= status < 400:
+            raise ValueError(f"akinator.com answered {status}.")
+
+        self.finished = True
+        self.win = True
+        self.akitude = "triomphe.png"
+        self.id_proposition = ""
+
+        try:
+            fields = extract_stream(chunks, CHOICE_FIELDS)
+        except Exception:
+            fields = {}
+
+        if all(field in fields for field in CHOICE_FIELDS):
+            self.question = f"{fields['win_sentence']}\n{fields['already_played']} {fields['times_selected']} {fields['times']}"
+
+        self.progression = 100
+
+    def _handle(self, content):
+        # json.loads() on the raw bytes detects UTF-8/16/32 itself, without charset sniffing
+        try:
+            data = json.loads(content)
+        except Exception as e:
+            if b"A technical problem has ocurred." in content:
+                raise RuntimeError("A technical problem has occurred. Please try again later.") from e
+            raise RuntimeError("Failed to parse the response as JSON.") from e
+
+        if "completion" not in data:
+            data["completion"] = self.completion
+        if data["completion"] == "KO - TIMEOUT":
+            raise RuntimeError("The session has timed out. Please start a new game.")
+        if data["completion"] == "SOUNDLIKE":
+            self.finished = True
+            self.win = True
+            if not self.id_proposition:
+                self.defeat()
+        elif "id_proposition" in data:
+            self.win = True
+            self.id_proposition = data["id_proposition"]
+            self.name_proposition = data["name_proposition"]
+            self.description_proposition = data["description_proposition"]
+            self.step_last_proposition = self.step
+            self.pseudo = data["pseudo"]
+            self.flag_photo = data["flag_photo"]
+            self.photo = data["photo"]
+        else:
+            self.akitude = sys.intern(data["akitude"])
+            self.step = int(data["step"])
+            self.progression = float(data["progression"])
+            self.question = sys.intern(data["question"])
+        self.completion = sys.intern(data["completion"])
+
+    def _snapshot(self):
+        return self.step, self.progression, self.question, self.akitude
+
+    def _restore(self, snapshot):
+        self.step, self.progression, self.question, self.akitude = snapshot
+
+    def _remember(self):
+        if self.history is None:
+            self.history = []
+        history = self.history
+        while history and history[-1][0] >= self.step:
+            history.pop()
+        history.append(self._snapshot())
+
+    def _previous(self):
+        if self.win:
+            # Going back from a proposition returns to the question it followed
+            return self._snapshot()
+        for snapshot in reversed(self.history or ()):
+            if snapshot[0] < self.step:
+                return snapshot if snapshot[0] == self.step - 1 else None
+        return None
+
+    def _cancelled(self, target):
+        # akinator.com answered the first queued /cancel_answer; self now holds its state
+        self._pending.pop(0)
+        if (self.step, self.question) != (target[0], target[2]):
+            self._pending.clear()
+            self.history = []
+            raise HistoryDiverged(self, "akinator.com went back to a different question.")
+
+    def _cancel_failed(self, error):
+        # akinator.com is still where the first queued /cancel_answer was sent from
+        _, left, win = self._pending[0]
+        if self.history is None:
+            self.history = []
+        self.history.extend(request.target for request, _, _ in reversed(self._pending))
+        self._pending.clear()
+        self._restore(left)
+        self.win = win
+        raise HistoryDiverged(self, "Failed to go back to the previous question.") from error
+
+    def defeat(self):
+        """
+        Handles the defeat scenario in the game.
+        """
+        self.finished = True
+        self.win = False
+        self.akitude = "deception.png"
+        self.id_proposition = ""
+        self.question = DEFEAT_QUESTIONS[self.language]
+        self.progression = 100
+
+    @property
+    def confidence(self) -> float:
+        """
+        Returns the confidence level of the current question.
+        """
+        return self.progression / 100
+
+    @property
+    def theme_id(self) -> int:
+        """
+        Returns the ID of the current theme.
+        """
+        return THEME_IDS[self.theme]
+
+    @property
+    def theme_name(self) -> str:
+        """
+        Returns the name of the current theme.
+        """
+        return "Characters" if self.theme == "c" else "Animals" if self.theme == "a" else "Objects"
+
+    @property
+    def akitude_url(self) -> str:
+        """
+        Returns the URL of the current akitude image.
+        """
+        return f"https://{self.language}.akinator.com/assets/img/akitudes_670x1096/{self.akitude}"
+
+    def __str__(self):
+        if self.win and not self.finished:
+            return f"{self.proposition} {self.name_proposition} ({self.description_proposition})"
+        return self.question
+
+    def __repr__(self):
+        return f"<Akinator Client (Language: {self.language}, Theme: {self.theme_name}, Step: {self.step}, Progression: {self.progression}%)>"
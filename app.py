@@ -1,17 +1,144 @@
 # Backend: Flask API (app.py)
 # Install: pip install flask flask-cors akinator.py
 
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify
 from flask_cors import CORS
-from akinator import Akinator
+from akiclient import Akinator, HistoryDiverged
+from akinator.client import LANG_MAP, THEME_MAP
 from akinator.exceptions import CantGoBackAnyFurther, InvalidChoiceError
+from session_store import LockTimeout, MemorySessionStore, RedisSessionStore
+from scraper_pool import PoolTimeout, ScraperPool
+from game_pool import GamePool
+from image_cache import ImageCache
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+import game_events
+import metrics
+import ua_cache
+import os
+import pickle
+import threading
 import uuid
 
 app = Flask(__name__)
 CORS(app)
 
-# Store game sessions in memory (use Redis/database in production)
-sessions = {}
+# Handler and akinator.com latency histograms, served on /metrics
+metrics.init_app(app)
+
+# Parse cloudscraper's browsers.json once per process, not once per scraper
+ua_cache.install()
+
+# Abandoned games are dropped after SESSION_TTL idle seconds (or when
+# SESSION_MAX_SIZE is exceeded) so a long-running kiosk stays flat in memory.
+# Set SESSION_REDIS_URL to keep sessions in Redis instead of this process.
+SESSION_TTL = int(os.environ.get('SESSION_TTL', 900))
+SESSION_MAX_SIZE = int(os.environ.get('SESSION_MAX_SIZE', 1000))
+SESSION_REDIS_URL = os.environ.get('SESSION_REDIS_URL')
+# With SESSION_REDIS_URL, calls on one game are serialized by a lock in Redis that is
+# let go after this many seconds even if its worker died holding it
+GAME_LOCK_SECONDS = int(os.environ.get('GAME_LOCK_SECONDS', 120))
+
+# Games don't own a scraper: each upstream call leases one from this pool, so
+# connections to {lang}.akinator.com stay open and are reused across games.
+SCRAPER_POOL_SIZE = int(os.environ.get('SCRAPER_POOL_SIZE', 8))
+SCRAPER_POOL_WARM = os.environ.get('SCRAPER_POOL_WARM', 'en')
+
+# At most SCRAPER_POOL_SIZE calls per host run at once; the rest queue for up to
+# SCRAPER_POOL_TIMEOUT seconds (SCRAPER_POOL_MAX_WAITING of them). A call that can't
+# get through in time is answered 503 with Retry-After straight away.
+SCRAPER_POOL_TIMEOUT = float(os.environ.get('SCRAPER_POOL_TIMEOUT', 5))
+SCRAPER_POOL_MAX_WAITING = os.environ.get('SCRAPER_POOL_MAX_WAITING')
+
+# Point at a mock_akinator.py server for load tests
+AKINATOR_UPSTREAM = os.environ.get('AKINATOR_UPSTREAM')
+
+scrapers = ScraperPool(
+    size=SCRAPER_POOL_SIZE,
+    timeout=SCRAPER_POOL_TIMEOUT,
+    max_waiting=int(SCRAPER_POOL_MAX_WAITING) if SCRAPER_POOL_MAX_WAITING else None,
+    upstream=AKINATOR_UPSTREAM,
+)
+if SCRAPER_POOL_WARM:
+    scrapers.warm(SCRAPER_POOL_WARM.split(','))
+
+def dump_session(entry):
+    # Akinator pickles its GameState slots only, without the scraper or policy
+    return pickle.dumps({'client': entry['client'], 'user_info': entry['user_info']})
+
+def load_session(data):
+    entry = pickle.loads(data)
+    return {'client': entry['client'], 'user_info': entry['user_info'], 'lock': threading.Lock()}
+
+# GAME_POOL_SIZE games per GAME_POOL_KEYS entry (language:theme:child_mode, comma
+# separated) are kept started in the background, so /api/start usually hands one out
+# without calling akinator.com. Unused games are replaced after GAME_POOL_MAX_AGE seconds.
+GAME_POOL_SIZE = int(os.environ.get('GAME_POOL_SIZE', 2))
+GAME_POOL_KEYS = os.environ.get('GAME_POOL_KEYS', 'en:c:0')
+GAME_POOL_MAX_AGE = int(os.environ.get('GAME_POOL_MAX_AGE', 240))
+
+games = None
+if GAME_POOL_SIZE > 0:
+    games = GamePool(
+        scrapers,
+        keys=[(language, theme, child_mode == '1') for language, theme, child_mode in
+              (key.split(':') for key in GAME_POOL_KEYS.split(','))],
+        size=GAME_POOL_SIZE,
+        max_age=GAME_POOL_MAX_AGE,
+    ).start()
+    metrics.Gauge('aki_game_pool_ready', 'Pre-started games waiting for a player.', lambda: len(games))
+
+# Akitude images and character photos are proxied through /api/image and cached in
+# memory, and also on disk under IMAGE_CACHE_DIR if set (a directory private to this user)
+IMAGE_CACHE_DIR = os.environ.get('IMAGE_CACHE_DIR')
+images = ImageCache(
+    IMAGE_CACHE_DIR or None,
+    memory_bytes=int(os.environ.get('IMAGE_CACHE_MEMORY_MB', 32)) << 20,
+    disk_bytes=int(os.environ.get('IMAGE_CACHE_DISK_MB', 256)) << 20,
+)
+
+# /api/back is answered from the game's history when it has the previous question,
+# and confirmed with akinator.com on these threads after the response has gone out.
+# With SESSION_REDIS_URL it is confirmed before answering instead, since another
+# worker could load the game before a background confirmation was stored.
+RECONCILE_IN_BACKGROUND = not SESSION_REDIS_URL
+reconciler = ThreadPoolExecutor(max_workers=SCRAPER_POOL_SIZE, thread_name_prefix='reconcile')
+
+def reconcile(entry):
+    client = entry['client']
+    with entry['lock']:
+        try:
+            with scrapers.bind(client):
+                client.sync()
+        except PoolTimeout:
+            pass  # The next call on this game sends it
+        except HistoryDiverged as e:
+            entry['diverged'] = e
+
+@contextmanager
+def held_game(session_id, entry):
+    """
+    Hold a game for one call and yield its entry. In Redis mode every worker loads its
+    own copy, so the game's Redis lock is taken too and the entry re-read under it.
+    """
+    with entry['lock']:
+        if not SESSION_REDIS_URL:
+            yield entry
+            return
+        with sessions.lock(session_id, timeout=GAME_LOCK_SECONDS, wait=SCRAPER_POOL_TIMEOUT):
+            current = sessions.get(session_id)
+            if current is None:
+                raise RuntimeError('Invalid session')
+            yield current
+
+def upstream_busy(e):
+    return jsonify({'success': False, 'error': str(e)}), 503, {'Retry-After': str(e.retry_after)}
+
+if SESSION_REDIS_URL:
+    sessions = RedisSessionStore(SESSION_REDIS_URL, ttl=SESSION_TTL, dumps=dump_session, loads=load_session)
+else:
+    sessions = MemorySessionStore(ttl=SESSION_TTL, max_size=SESSION_MAX_SIZE)
+    sessions.start_reaper(interval=min(60, SESSION_TTL))
 
 @app.route('/api/start', methods=['POST'])
 def start_game():
@@ -21,22 +148,40 @@ def start_game():
     institution = data.get('institution')
     language = data.get('language', 'en')
     theme = data.get('theme', 'c')
+    child_mode = data.get('child_mode', False)
+
+    # Checked before a pooled game or scraper is looked up: every language gets its own
+    # scraper pool, so made-up ones (or "english" next to "en") must not reach it
+    if isinstance(language, str):
+        language = LANG_MAP.get(language.lower(), language.lower())
+    if not isinstance(language, str) or language not in THEME_MAP:
+        return jsonify({'success': False, 'error': 'Unknown language'}), 400
+    if theme not in THEME_MAP[language]:
+        return jsonify({'success': False, 'error': 'Theme not available for this language'}), 400
+    if not isinstance(child_mode, bool):
+        return jsonify({'success': False, 'error': 'child_mode must be true or false'}), 400
     
-    # Create new Akinator client
     session_id = str(uuid.uuid4())
-    client = Akinator()
     
     try:
-        client.start_game()
+        # Hand out a pre-started game, or start one now on a pooled scraper
+        client = games.take(language, theme, child_mode) if games else None
+        if client is None:
+            with scrapers.lease(language) as scraper:
+                client = Akinator(session=scraper)
+                client.start_game(language=language, theme=theme, child_mode=child_mode)
+                client.session = None
         
-        sessions[session_id] = {
+        sessions.set(session_id, {
             'client': client,
             'user_info': {
                 'name': name,
                 'phone': phone,
                 'institution': institution
-            }
-        }
+            },
+            # Held for every akinator.com call on this game, so they go out one at a time
+            'lock': threading.Lock()
+        })
         
         return jsonify({
             'success': True,
@@ -46,87 +191,150 @@ def start_game():
             'progression': client.progression,
             'akitude_url': client.akitude_url
         })
+    except PoolTimeout as e:
+        return upstream_busy(e)
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
+def question_payload(client):
+    return {
+        'success': True,
+        'question': client.question,
+        'step': client.step,
+        'progression': client.progression,
+        'akitude_url': client.akitude_url
+    }
+
+def answer_payload(client):
+    response = {
+        'success': True,
+        'question': str(client),
+        'step': client.step,
+        'progression': client.progression,
+        'finished': client.finished,
+        'win': client.win,
+        'akitude_url': client.akitude_url
+    }
+    
+    # If Akinator made a guess
+    if client.win and not client.finished:
+        response['guess'] = {
+            'name': client.name_proposition,
+            'description': client.description_proposition,
+            'photo': client.photo,
+            'pseudo': client.pseudo
+        }
+    
+    # If game is finished
+    if client.finished:
+        response['final_message'] = client.question
+        if client.photo:
+            response['photo'] = client.photo
+            response['name'] = client.name_proposition
+            response['description'] = client.description_proposition
+    
+    return response
+
+def outcome(call):
+    """Run an akinator.com call, returning (status, payload, headers)."""
+    try:
+        return 200, call(), {}
+    except HistoryDiverged as e:
+        # The player was shown a question akinator.com isn't on; show them the one it is on
+        return 409, dict(question_payload(e.client), success=False, error=str(e), diverged=True), {}
+    except InvalidChoiceError as e:
+        return 400, {'success': False, 'error': str(e)}, {}
+    except CantGoBackAnyFurther:
+        return 400, {'success': False, 'error': "You can't go back any further!"}, {}
+    except PoolTimeout as e:
+        return 503, {'success': False, 'error': str(e)}, {'Retry-After': str(e.retry_after)}
+    except LockTimeout:
+        return 503, {'success': False, 'error': 'This game is busy with another request.'}, {'Retry-After': '1'}
+    except Exception as e:
+        return 500, {'success': False, 'error': str(e)}, {}
+
+def raise_diverged(entry):
+    # A background confirmation found akinator.com elsewhere; tell the next call
+    error = entry.pop('diverged', None)
+    if error is not None:
+        raise error
+
+def respond(call):
+    # One JSON document, or game_events' stream if the client asked for one
+    if not game_events.wanted(request.headers.get('Accept')):
+        status, payload, headers = outcome(call)
+        return jsonify(payload), status, headers
+    
+    def stream():
+        yield game_events.thinking()
+        status, payload, _ = outcome(call)
+        if status == 200:
+            yield from game_events.transitions(payload)
+        else:
+            yield game_events.error(status, payload)
+    
+    return Response(stream(), mimetype=game_events.CONTENT_TYPE, headers=game_events.HEADERS)
+
 @app.route('/api/answer', methods=['POST'])
 def submit_answer():
     data = request.json
     session_id = data.get('session_id')
     answer = data.get('answer')
     
-    if session_id not in sessions:
+    entry = sessions.get(session_id) if session_id else None
+    if entry is None:
         return jsonify({'success': False, 'error': 'Invalid session'}), 400
     
-    client = sessions[session_id]['client']
+    def call():
+        with held_game(session_id, entry) as current:
+            client = current['client']
+            raise_diverged(current)
+            with scrapers.bind(client):
+                client.answer(answer)
+            sessions.set(session_id, current)
+        return answer_payload(client)
     
-    try:
-        client.answer(answer)
-        
-        response = {
-            'success': True,
-            'question': str(client),
-            'step': client.step,
-            'progression': client.progression,
-            'finished': client.finished,
-            'win': client.win,
-            'akitude_url': client.akitude_url
-        }
-        
-        # If Akinator made a guess
-        if client.win and not client.finished:
-            response['guess'] = {
-                'name': client.name_proposition,
-                'description': client.description_proposition,
-                'photo': client.photo,
-                'pseudo': client.pseudo
-            }
-        
-        # If game is finished
-        if client.finished:
-            response['final_message'] = client.question
-            if client.photo:
-                response['photo'] = client.photo
-                response['name'] = client.name_proposition
-                response['description'] = client.description_proposition
-        
-        return jsonify(response)
-    except InvalidChoiceError as e:
-        return jsonify({'success': False, 'error': str(e)}), 400
-    except Exception as e:
-        return jsonify({'success': False, 'error': str(e)}), 500
+    return respond(call)
 
 @app.route('/api/back', methods=['POST'])
 def go_back():
     data = request.json
     session_id = data.get('session_id')
     
-    if session_id not in sessions:
+    entry = sessions.get(session_id) if session_id else None
+    if entry is None:
         return jsonify({'success': False, 'error': 'Invalid session'}), 400
     
-    client = sessions[session_id]['client']
+    def call():
+        with held_game(session_id, entry) as current:
+            client = current['client']
+            raise_diverged(current)
+            if RECONCILE_IN_BACKGROUND and client.can_back_locally:
+                client.back()
+                reconciler.submit(reconcile, current)
+            else:
+                with scrapers.bind(client):
+                    client.back()
+                    client.sync()
+            sessions.set(session_id, current)
+        return question_payload(client)
     
-    try:
-        client.back()
-        return jsonify({
-            'success': True,
-            'question': client.question,
-            'step': client.step,
-            'progression': client.progression,
-            'akitude_url': client.akitude_url
-        })
-    except CantGoBackAnyFurther:
-        return jsonify({'success': False, 'error': "You can't go back any further!"}), 400
-    except Exception as e:
-        return jsonify({'success': False, 'error': str(e)}), 500
+    return respond(call)
+
+@app.route('/api/image')
+def image():
+    # ?url= is an akitude_url or photo from the other endpoints, ?w= an optional width
+    status, headers, body = images.response(
+        request.args.get('url', ''), request.args.get('w', type=int), request.headers.get('If-None-Match'))
+    return body, status, headers
 
 @app.route('/api/end', methods=['POST'])
 def end_session():
     data = request.json
     session_id = data.get('session_id')
     
-    if session_id in sessions:
-        del sessions[session_id]
+    if session_id:
+        sessions.delete(session_id)
     
     return jsonify({'success': True})
 
@@ -1,457 +1,555 @@
 # app.py - Complete Akinator Flask Application
 # Install: pip install flask akinator.py
 
-from flask import Flask, render_template_string, request, session, redirect, url_for
-from akinator import Client
+from flask import Flask, g, request, session, redirect, url_for
 from akinator.exceptions import CantGoBackAnyFurther
+from akiclient import Client
+from scraper_pool import ScraperPool
+from image_cache import ImageCache
+from server_session import ServerSessionInterface
+from session_store import MemorySessionStore, RedisSessionStore
+from template_registry import TemplateRegistry
+import hashlib
+import os
 import secrets
+import time
+import ua_cache
 
 app = Flask(__name__)
 app.secret_key = secrets.token_hex(16)
 
-# HTML Template
-HTML_TEMPLATE = """
-<!DOCTYPE html>
+# Parse cloudscraper's browsers.json once per process, not once per Client()
+ua_cache.install()
+
+# The session cookie only holds an opaque id; the player's info and game state stay
+# server-side and are dropped after SESSION_TTL idle seconds. Set SESSION_REDIS_URL
+# to share them between worker processes.
+SESSION_TTL = int(os.environ.get('SESSION_TTL', 900))
+SESSION_MAX_SIZE = int(os.environ.get('SESSION_MAX_SIZE', 1000))
+SESSION_REDIS_URL = os.environ.get('SESSION_REDIS_URL')
+
+if SESSION_REDIS_URL:
+    sessions = RedisSessionStore(SESSION_REDIS_URL, ttl=SESSION_TTL)
+else:
+    sessions = MemorySessionStore(ttl=SESSION_TTL, max_size=SESSION_MAX_SIZE)
+    sessions.start_reaper(interval=min(60, SESSION_TTL))
+app.session_interface = ServerSessionInterface(sessions)
+
+# Every request rehydrates the game from the session onto a pooled scraper
+# (AKINATOR_UPSTREAM points it at a mock_akinator.py server for load tests)
+scrapers = ScraperPool(upstream=os.environ.get('AKINATOR_UPSTREAM'))
+
+# Character photos are served through /image from memory, and from disk under
+# IMAGE_CACHE_DIR if set (a directory private to this user)
+images = ImageCache(os.environ.get('IMAGE_CACHE_DIR') or None)
+
+# With DIRECT_ANSWER=1, POST /answer renders the next stage itself instead of
+# redirecting to GET /game, saving the player a round trip per answer
+DIRECT_ANSWER = os.environ.get('DIRECT_ANSWER', '').lower() in ('1', 'true', 'yes')
+
+# Token of every answer sent upstream, claimed before sending so a form submitted
+# twice reaches akinator once. Kept in Redis with SESSION_REDIS_URL, like the
+# sessions, so a duplicate landing on another worker is caught too.
+ANSWER_CLAIM_TTL = scrapers.timeout + 30
+# A duplicate waits this long at most for the first to finish, so a double click
+# doesn't hold a worker thread, then shows whatever /game has
+DUPLICATE_WAIT = 2
+if SESSION_REDIS_URL:
+    answer_claims = RedisSessionStore(SESSION_REDIS_URL, ttl=ANSWER_CLAIM_TTL, prefix='aki-answer:')
+else:
+    answer_claims = MemorySessionStore(ttl=ANSWER_CLAIM_TTL, max_size=SESSION_MAX_SIZE)
+    answer_claims.start_reaper(interval=min(60, ANSWER_CLAIM_TTL))
+
+# The page templates below are compiled once at import. Set TEMPLATE_CACHE_DIR to a
+# directory private to this user to also keep the compiled code on disk across restarts
+templates = TemplateRegistry(app, cache_dir=os.environ.get('TEMPLATE_CACHE_DIR') or None)
+
+# Stylesheet, served once from /assets/page.<hash>.css and then cached by the browser
+PAGE_CSS = """
+* {
+    margin: 0;
+    padding: 0;
+    box-sizing: border-box;
+}
+
+body {
+    font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif;
+    background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
+    min-height: 100vh;
+    display: flex;
+    align-items: center;
+    justify-content: center;
+    padding: 20px;
+}
+
+.container {
+    background: white;
+    border-radius: 30px;
+    box-shadow: 0 20px 60px rgba(0,0,0,0.3);
+    max-width: 600px;
+    width: 100%;
+    padding: 40px;
+    animation: slideIn 0.5s ease;
+}
+
+@keyframes slideIn {
+    from {
+        opacity: 0;
+        transform: translateY(30px);
+    }
+    to {
+        opacity: 1;
+        transform: translateY(0);
+    }
+}
+
+.header {
+    text-align: center;
+    margin-bottom: 30px;
+}
+
+.brain-icon {
+    width: 80px;
+    height: 80px;
+    background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
+    border-radius: 50%;
+    display: inline-flex;
+    align-items: center;
+    justify-content: center;
+    font-size: 40px;
+    margin-bottom: 15px;
+}
+
+h1 {
+    color: #333;
+    font-size: 2.5em;
+    margin-bottom: 10px;
+}
+
+.subtitle {
+    color: #666;
+    font-size: 1.1em;
+}
+
+.form-group {
+    margin-bottom: 20px;
+}
+
+label {
+    display: block;
+    color: #555;
+    font-weight: 600;
+    margin-bottom: 8px;
+    font-size: 0.95em;
+}
+
+input[type="text"],
+input[type="tel"] {
+    width: 100%;
+    padding: 15px;
+    border: 2px solid #e0e0e0;
+    border-radius: 15px;
+    font-size: 1em;
+    transition: all 0.3s;
+}
+
+input[type="text"]:focus,
+input[type="tel"]:focus {
+    outline: none;
+    border-color: #667eea;
+    box-shadow: 0 0 0 3px rgba(102, 126, 234, 0.1);
+}
+
+.btn {
+    display: inline-block;
+    padding: 15px 30px;
+    border: none;
+    border-radius: 15px;
+    font-size: 1.1em;
+    font-weight: 600;
+    cursor: pointer;
+    transition: all 0.3s;
+    text-decoration: none;
+    text-align: center;
+}
+
+.btn-primary {
+    background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
+    color: white;
+    width: 100%;
+}
+
+.btn-primary:hover {
+    transform: translateY(-2px);
+    box-shadow: 0 10px 20px rgba(102, 126, 234, 0.3);
+}
+
+.question-box {
+    background: linear-gradient(135deg, #f5f7fa 0%, #e4e8f0 100%);
+    padding: 30px;
+    border-radius: 20px;
+    margin-bottom: 25px;
+    text-align: center;
+}
+
+.question-text {
+    font-size: 1.5em;
+    color: #333;
+    font-weight: 600;
+    line-height: 1.4;
+}
+
+.progress-bar {
+    width: 100%;
+    height: 8px;
+    background: #e0e0e0;
+    border-radius: 10px;
+    overflow: hidden;
+    margin-bottom: 20px;
+}
+
+.progress-fill {
+    height: 100%;
+    background: linear-gradient(90deg, #667eea 0%, #764ba2 100%);
+    transition: width 0.5s ease;
+}
+
+.progress-text {
+    text-align: center;
+    color: #666;
+    font-size: 0.9em;
+    margin-bottom: 20px;
+}
+
+.answer-grid {
+    display: grid;
+    grid-template-columns: repeat(2, 1fr);
+    gap: 15px;
+    margin-bottom: 20px;
+}
+
+.answer-grid.five-buttons {
+    grid-template-columns: repeat(3, 1fr);
+}
+
+.btn-answer {
+    padding: 20px;
+    border: none;
+    border-radius: 15px;
+    font-size: 1.1em;
+    font-weight: 600;
+    cursor: pointer;
+    transition: all 0.3s;
+    color: white;
+}
+
+.btn-yes {
+    background: #4caf50;
+}
+
+.btn-yes:hover {
+    background: #45a049;
+    transform: translateY(-2px);
+    box-shadow: 0 5px 15px rgba(76, 175, 80, 0.3);
+}
+
+.btn-no {
+    background: #f44336;
+}
+
+.btn-no:hover {
+    background: #da190b;
+    transform: translateY(-2px);
+    box-shadow: 0 5px 15px rgba(244, 67, 54, 0.3);
+}
+
+.btn-idk {
+    background: #9e9e9e;
+}
+
+.btn-idk:hover {
+    background: #757575;
+    transform: translateY(-2px);
+    box-shadow: 0 5px 15px rgba(158, 158, 158, 0.3);
+}
+
+.btn-probably {
+    background: #2196f3;
+}
+
+.btn-probably:hover {
+    background: #0b7dda;
+    transform: translateY(-2px);
+    box-shadow: 0 5px 15px rgba(33, 150, 243, 0.3);
+}
+
+.btn-probably-not {
+    background: #ff9800;
+}
+
+.btn-probably-not:hover {
+    background: #e68900;
+    transform: translateY(-2px);
+    box-shadow: 0 5px 15px rgba(255, 152, 0, 0.3);
+}
+
+.btn-back {
+    background: #9c27b0;
+    grid-column: span 1;
+}
+
+.btn-back:hover {
+    background: #7b1fa2;
+    transform: translateY(-2px);
+    box-shadow: 0 5px 15px rgba(156, 39, 176, 0.3);
+}
+
+.btn-back:disabled {
+    background: #ccc;
+    cursor: not-allowed;
+    transform: none;
+}
+
+.result-card {
+    text-align: center;
+}
+
+.result-image {
+    width: 200px;
+    height: 200px;
+    border-radius: 50%;
+    object-fit: cover;
+    border: 5px solid #667eea;
+    margin: 20px auto;
+    display: block;
+}
+
+.result-name {
+    font-size: 2em;
+    color: #333;
+    margin-bottom: 10px;
+    font-weight: 700;
+}
+
+.result-description {
+    color: #666;
+    font-size: 1.2em;
+    margin-bottom: 20px;
+}
+
+.result-message {
+    background: linear-gradient(135deg, #f5f7fa 0%, #e4e8f0 100%);
+    padding: 20px;
+    border-radius: 15px;
+    margin: 20px 0;
+    white-space: pre-line;
+    line-height: 1.6;
+}
+
+.info-row {
+    display: flex;
+    justify-content: space-between;
+    align-items: center;
+    margin-bottom: 15px;
+}
+
+.user-name {
+    font-weight: 600;
+    color: #333;
+}
+
+.institution {
+    color: #666;
+    font-size: 0.9em;
+}
+
+.error-message {
+    background: #ffebee;
+    color: #c62828;
+    padding: 15px;
+    border-radius: 10px;
+    margin-bottom: 20px;
+    border-left: 4px solid #c62828;
+}
+
+.sparkle {
+    font-size: 60px;
+    margin-bottom: 20px;
+}
+"""
+CSS_DIGEST = hashlib.sha256(PAGE_CSS.encode()).hexdigest()[:12]
+
+# Shared page layout; each stage below only fills in the content block
+LAYOUT_TEMPLATE = """<!DOCTYPE html>
 <html lang="en">
 <head>
     <meta charset="UTF-8">
     <meta name="viewport" content="width=device-width, initial-scale=1.0">
     <title>Akinator - Mind Reader</title>
-    <style>
-        * {
-            margin: 0;
-            padding: 0;
-            box-sizing: border-box;
-        }
-        
-        body {
-            font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif;
-            background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-            min-height: 100vh;
-            display: flex;
-            align-items: center;
-            justify-content: center;
-            padding: 20px;
-        }
-        
-        .container {
-            background: white;
-            border-radius: 30px;
-            box-shadow: 0 20px 60px rgba(0,0,0,0.3);
-            max-width: 600px;
-            width: 100%;
-            padding: 40px;
-            animation: slideIn 0.5s ease;
-        }
-        
-        @keyframes slideIn {
-            from {
-                opacity: 0;
-                transform: translateY(30px);
-            }
-            to {
-                opacity: 1;
-                transform: translateY(0);
-            }
-        }
-        
-        .header {
-            text-align: center;
-            margin-bottom: 30px;
-        }
-        
-        .brain-icon {
-            width: 80px;
-            height: 80px;
-            background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-            border-radius: 50%;
-            display: inline-flex;
-            align-items: center;
-            justify-content: center;
-            font-size: 40px;
-            margin-bottom: 15px;
-        }
-        
-        h1 {
-            color: #333;
-            font-size: 2.5em;
-            margin-bottom: 10px;
-        }
-        
-        .subtitle {
-            color: #666;
-            font-size: 1.1em;
-        }
-        
-        .form-group {
-            margin-bottom: 20px;
-        }
-        
-        label {
-            display: block;
-            color: #555;
-            font-weight: 600;
-            margin-bottom: 8px;
-            font-size: 0.95em;
-        }
-        
-        input[type="text"],
-        input[type="tel"] {
-            width: 100%;
-            padding: 15px;
-            border: 2px solid #e0e0e0;
-            border-radius: 15px;
-            font-size: 1em;
-            transition: all 0.3s;
-        }
-        
-        input[type="text"]:focus,
-        input[type="tel"]:focus {
-            outline: none;
-            border-color: #667eea;
-            box-shadow: 0 0 0 3px rgba(102, 126, 234, 0.1);
-        }
-        
-        .btn {
-            display: inline-block;
-            padding: 15px 30px;
-            border: none;
-            border-radius: 15px;
-            font-size: 1.1em;
-            font-weight: 600;
-            cursor: pointer;
-            transition: all 0.3s;
-            text-decoration: none;
-            text-align: center;
-        }
-        
-        .btn-primary {
-            background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-            color: white;
-            width: 100%;
-        }
-        
-        .btn-primary:hover {
-            transform: translateY(-2px);
-            box-shadow: 0 10px 20px rgba(102, 126, 234, 0.3);
-        }
-        
-        .question-box {
-            background: linear-gradient(135deg, #f5f7fa 0%, #e4e8f0 100%);
-            padding: 30px;
-            border-radius: 20px;
-            margin-bottom: 25px;
-            text-align: center;
-        }
-        
-        .question-text {
-            font-size: 1.5em;
-            color: #333;
-            font-weight: 600;
-            line-height: 1.4;
-        }
-        
-        .progress-bar {
-            width: 100%;
-            height: 8px;
-            background: #e0e0e0;
-            border-radius: 10px;
-            overflow: hidden;
-            margin-bottom: 20px;
-        }
-        
-        .progress-fill {
-            height: 100%;
-            background: linear-gradient(90deg, #667eea 0%, #764ba2 100%);
-            transition: width 0.5s ease;
-        }
-        
-        .progress-text {
-            text-align: center;
-            color: #666;
-            font-size: 0.9em;
-            margin-bottom: 20px;
-        }
-        
-        .answer-grid {
-            display: grid;
-            grid-template-columns: repeat(2, 1fr);
-            gap: 15px;
-            margin-bottom: 20px;
-        }
-        
-        .answer-grid.five-buttons {
-            grid-template-columns: repeat(3, 1fr);
-        }
-        
-        .btn-answer {
-            padding: 20px;
-            border: none;
-            border-radius: 15px;
-            font-size: 1.1em;
-            font-weight: 600;
-            cursor: pointer;
-            transition: all 0.3s;
-            color: white;
-        }
-        
-        .btn-yes {
-            background: #4caf50;
-        }
-        
-        .btn-yes:hover {
-            background: #45a049;
-            transform: translateY(-2px);
-            box-shadow: 0 5px 15px rgba(76, 175, 80, 0.3);
-        }
-        
-        .btn-no {
-            background: #f44336;
-        }
-        
-        .btn-no:hover {
-            background: #da190b;
-            transform: translateY(-2px);
-            box-shadow: 0 5px 15px rgba(244, 67, 54, 0.3);
-        }
-        
-        .btn-idk {
-            background: #9e9e9e;
-        }
-        
-        .btn-idk:hover {
-            background: #757575;
-            transform: translateY(-2px);
-            box-shadow: 0 5px 15px rgba(158, 158, 158, 0.3);
-        }
-        
-        .btn-probably {
-            background: #2196f3;
-        }
-        
-        .btn-probably:hover {
-            background: #0b7dda;
-            transform: translateY(-2px);
-            box-shadow: 0 5px 15px rgba(33, 150, 243, 0.3);
-        }
-        
-        .btn-probably-not {
-            background: #ff9800;
-        }
-        
-        .btn-probably-not:hover {
-            background: #e68900;
-            transform: translateY(-2px);
-            box-shadow: 0 5px 15px rgba(255, 152, 0, 0.3);
-        }
-        
-        .btn-back {
-            background: #9c27b0;
-            grid-column: span 1;
-        }
-        
-        .btn-back:hover {
-            background: #7b1fa2;
-            transform: translateY(-2px);
-            box-shadow: 0 5px 15px rgba(156, 39, 176, 0.3);
-        }
-        
-        .btn-back:disabled {
-            background: #ccc;
-            cursor: not-allowed;
-            transform: none;
-        }
-        
-        .result-card {
-            text-align: center;
-        }
-        
-        .result-image {
-            width: 200px;
-            height: 200px;
-            border-radius: 50%;
-            object-fit: cover;
-            border: 5px solid #667eea;
-            margin: 20px auto;
-            display: block;
-        }
-        
-        .result-name {
-            font-size: 2em;
-            color: #333;
-            margin-bottom: 10px;
-            font-weight: 700;
-        }
-        
-        .result-description {
-            color: #666;
-            font-size: 1.2em;
-            margin-bottom: 20px;
-        }
-        
-        .result-message {
-            background: linear-gradient(135deg, #f5f7fa 0%, #e4e8f0 100%);
-            padding: 20px;
-            border-radius: 15px;
-            margin: 20px 0;
-            white-space: pre-line;
-            line-height: 1.6;
-        }
-        
-        .info-row {
-            display: flex;
-            justify-content: space-between;
-            align-items: center;
-            margin-bottom: 15px;
-        }
-        
-        .user-name {
-            font-weight: 600;
-            color: #333;
-        }
-        
-        .institution {
-            color: #666;
-            font-size: 0.9em;
-        }
-        
-        .error-message {
-            background: #ffebee;
-            color: #c62828;
-            padding: 15px;
-            border-radius: 10px;
-            margin-bottom: 20px;
-            border-left: 4px solid #c62828;
-        }
-        
-        .sparkle {
-            font-size: 60px;
-            margin-bottom: 20px;
-        }
-    </style>
+    <link rel="stylesheet" href="{{ url_for('stylesheet', digest=css_digest) }}">
 </head>
 <body>
     <div class="container">
-        {% if stage == 'info' %}
-        <!-- User Information Form -->
-        <div class="header">
-            <div class="brain-icon">🧠</div>
-            <h1>Guessing game</h1>
-            <p class="subtitle">Think of a character, I'll read your mind!</p>
-        </div>
-        
-        <form method="POST" action="{{ url_for('start_game') }}">
-            <div class="form-group">
-                <label for="name">👤 Name</label>
-                <input type="text" id="name" name="name" placeholder="Your name" required>
-            </div>
-            
-            <div class="form-group">
-                <label for="phone">📱 Phone Number</label>
-                <input type="text" inputmode="numeric" pattern="[6-9][0-9]{9}" maxlength="10" placeholder="Enter mobile number" required>
-
-            </div>
-            
-            <div class="form-group">
-                <label for="institution">🏫 Institution</label>
-                <input type="text" id="institution" name="institution" placeholder="School/College name" required>
-            </div>
-            
-            <button type="submit" class="btn btn-primary">Start Game</button>
-        </form>
-        
-        {% elif stage == 'game' %}
-        <!-- Game Screen -->
-        <div class="info-row">
-            <div>
-                <span class="user-name">{{ user_info.name }}</span>
-                <div class="institution">{{ user_info.institution }}</div>
-            </div>
-            <div>
-                <strong>Question {{ step + 1 }}</strong>
-            </div>
-        </div>
-        
-        <div class="progress-bar">
-            <div class="progress-fill" style="width: {{ progression }}%"></div>
-        </div>
-        <div class="progress-text">Progress: {{ progression|round }}%</div>
-        
-        <div class="question-box">
-            <div class="question-text">{{ question }}</div>
-        </div>
-        
-        {% if error %}
-        <div class="error-message">{{ error }}</div>
-        {% endif %}
-        
-        <form method="POST" action="{{ url_for('answer') }}">
-            <div class="answer-grid five-buttons">
-                <button type="submit" name="answer" value="y" class="btn-answer btn-yes">✓ Yes</button>
-                <button type="submit" name="answer" value="n" class="btn-answer btn-no">✗ No</button>
-                <button type="submit" name="answer" value="i" class="btn-answer btn-idk">? Don't Know</button>
-                <button type="submit" name="answer" value="p" class="btn-answer btn-probably">Probably</button>
-                <button type="submit" name="answer" value="pn" class="btn-answer btn-probably-not">Probably Not</button>
-                <button type="submit" name="answer" value="b" class="btn-answer btn-back" {% if step == 0 %}disabled{% endif %}>← Back</button>
-            </div>
-        </form>
-        
-        {% elif stage == 'guess' %}
-        <!-- Guess Screen -->
-        <div class="header">
-            <div class="sparkle">✨</div>
-            <h1>I think I found it!</h1>
-        </div>
-        
-        <div class="result-card">
-            {% if guess.photo %}
-            <img src="{{ guess.photo }}" alt="{{ guess.name }}" class="result-image" onerror="this.style.display='none'">
-            {% endif %}
-            <div class="result-name">{{ guess.name }}</div>
-            <div class="result-description">{{ guess.description }}</div>
-        </div>
-        
-        <p style="text-align: center; font-size: 1.2em; margin-bottom: 20px;">Is this your character?</p>
-        
-        <form method="POST" action="{{ url_for('answer') }}">
-            <div class="answer-grid">
-                <button type="submit" name="answer" value="y" class="btn-answer btn-yes">✓ Yes, that's it!</button>
-                <button type="submit" name="answer" value="n" class="btn-answer btn-no">✗ No, try again</button>
-            </div>
-        </form>
-        
-        {% elif stage == 'finished' %}
-        <!-- Result Screen -->
-        <div class="result-card">
-            <div class="sparkle">{% if win %}🎉{% else %}🏆{% endif %}</div>
-            <h1>{% if win %}I Found It!{% else %}You Won!{% endif %}</h1>
-            
-            {% if photo %}
-            <img src="{{ photo }}" alt="{{ name }}" class="result-image" onerror="this.style.display='none'">
-            {% endif %}
-            
-            {% if name %}
-            <div class="result-name">{{ name }}</div>
-            {% endif %}
-            
-            {% if description %}
-            <div class="result-description">{{ description }}</div>
-            {% endif %}
-            
-            <div class="result-message">{{ final_message }}</div>
-            
-            <a href="{{ url_for('index') }}" class="btn btn-primary">Play Again</a>
-        </div>
-        {% endif %}
+{% block content %}{% endblock %}
     </div>
 </body>
 </html>
 """
 
+# User Information Form
+INFO_TEMPLATE = """{% extends 'layout.html' %}
+{% block content %}
+<div class="header">
+    <div class="brain-icon">🧠</div>
+    <h1>Guessing game</h1>
+    <p class="subtitle">Think of a character, I'll read your mind!</p>
+</div>
+
+<form method="POST" action="{{ url_for('start_game') }}">
+    <div class="form-group">
+        <label for="name">👤 Name</label>
+        <input type="text" id="name" name="name" placeholder="Your name" required>
+    </div>
+
+    <div class="form-group">
+        <label for="phone">📱 Phone Number</label>
+        <input type="text" inputmode="numeric" pattern="[6-9][0-9]{9}" maxlength="10" placeholder="Enter mobile number" required>
+
+    </div>
+
+    <div class="form-group">
+        <label for="institution">🏫 Institution</label>
+        <input type="text" id="institution" name="institution" placeholder="School/College name" required>
+    </div>
+
+    <button type="submit" class="btn btn-primary">Start Game</button>
+</form>
+{% endblock %}
+"""
+
+# Game Screen
+GAME_TEMPLATE = """{% extends 'layout.html' %}
+{% block content %}
+<div class="info-row">
+    <div>
+        <span class="user-name">{{ user_info.name }}</span>
+        <div class="institution">{{ user_info.institution }}</div>
+    </div>
+    <div>
+        <strong>Question {{ step + 1 }}</strong>
+    </div>
+</div>
+
+<div class="progress-bar">
+    <div class="progress-fill" style="width: {{ progression }}%"></div>
+</div>
+<div class="progress-text">Progress: {{ progression|round }}%</div>
+
+<div class="question-box">
+    <div class="question-text">{{ question }}</div>
+</div>
+
+{% if error %}
+<div class="error-message">{{ error }}</div>
+{% endif %}
+
+<form method="POST" action="{{ url_for('answer') }}">
+    <input type="hidden" name="token" value="{{ token }}">
+    <div class="answer-grid five-buttons">
+        <button type="submit" name="answer" value="y" class="btn-answer btn-yes">✓ Yes</button>
+        <button type="submit" name="answer" value="n" class="btn-answer btn-no">✗ No</button>
+        <button type="submit" name="answer" value="i" class="btn-answer btn-idk">? Don't Know</button>
+        <button type="submit" name="answer" value="p" class="btn-answer btn-probably">Probably</button>
+        <button type="submit" name="answer" value="pn" class="btn-answer btn-probably-not">Probably Not</button>
+        <button type="submit" name="answer" value="b" class="btn-answer btn-back" {% if step == 0 %}disabled{% endif %}>← Back</button>
+    </div>
+</form>
+{% endblock %}
+"""
+
+# Guess Screen
+GUESS_TEMPLATE = """{% extends 'layout.html' %}
+{% block content %}
+<div class="header">
+    <div class="sparkle">✨</div>
+    <h1>I think I found it!</h1>
+</div>
+
+<div class="result-card">
+    {% if guess.photo %}
+    <img src="{{ url_for('image', url=guess.photo, w=400) }}" alt="{{ guess.name }}" class="result-image" onerror="this.style.display='none'">
+    {% endif %}
+    <div class="result-name">{{ guess.name }}</div>
+    <div class="result-description">{{ guess.description }}</div>
+</div>
+
+<p style="text-align: center; font-size: 1.2em; margin-bottom: 20px;">Is this your character?</p>
+
+<form method="POST" action="{{ url_for('answer') }}">
+    <input type="hidden" name="token" value="{{ token }}">
+    <div class="answer-grid">
+        <button type="submit" name="answer" value="y" class="btn-answer btn-yes">✓ Yes, that's it!</button>
+        <button type="submit" name="answer" value="n" class="btn-answer btn-no">✗ No, try again</button>
+    </div>
+</form>
+{% endblock %}
+"""
+
+# Result Screen
+FINISHED_TEMPLATE = """{% extends 'layout.html' %}
+{% block content %}
+<div class="result-card">
+    <div class="sparkle">{% if win %}🎉{% else %}🏆{% endif %}</div>
+    <h1>{% if win %}I Found It!{% else %}You Won!{% endif %}</h1>
+
+    {% if photo %}
+    <img src="{{ url_for('image', url=photo, w=400) }}" alt="{{ name }}" class="result-image" onerror="this.style.display='none'">
+    {% endif %}
+
+    {% if name %}
+    <div class="result-name">{{ name }}</div>
+    {% endif %}
+
+    {% if description %}
+    <div class="result-description">{{ description }}</div>
+    {% endif %}
+
+    <div class="result-message">{{ final_message }}</div>
+
+    <a href="{{ url_for('index') }}" class="btn btn-primary">Play Again</a>
+</div>
+{% endblock %}
+"""
+
+# The .html names keep autoescaping on, as it was with render_template_string
+app.jinja_env.globals['css_digest'] = CSS_DIGEST
+templates.register('layout.html', LAYOUT_TEMPLATE)
+templates.register('info.html', INFO_TEMPLATE)
+templates.register('game.html', GAME_TEMPLATE)
+templates.register('guess.html', GUESS_TEMPLATE)
+templates.register('finished.html', FINISHED_TEMPLATE)
+
+@app.route('/assets/page.<digest>.css')
+def stylesheet(digest):
+    response = app.response_class(PAGE_CSS, mimetype='text/css')
+    response.set_etag(CSS_DIGEST)
+    if digest == CSS_DIGEST:
+        # The URL changes whenever the CSS does, so it can be cached for good
+        response.headers['Cache-Control'] = 'public, max-age=31536000, immutable'
+    else:
+        response.headers['Cache-Control'] = 'no-cache'
+    return response.make_conditional(request)
+
+@app.route('/image')
+def image():
+    status, headers, body = images.response(
+        request.args.get('url', ''), request.args.get('w', type=int), request.headers.get('If-None-Match'))
+    return body, status, headers
+
 @app.route('/')
 def index():
     session.clear()
-    return render_template_string(HTML_TEMPLATE, stage='info')
+    return templates.render('info.html')
 
 @app.route('/start', methods=['POST'])
 def start_game():
@@ -462,163 +560,127 @@ def start_game():
         'institution': request.form['institution']
     }
     
-    # Create Akinator client
-    client = Client()
     try:
-        client.start_game(language='en', theme='c')
+        # Create Akinator client on a pooled scraper
+        with scrapers.lease() as scraper:
+            client = Client(session=scraper)
+            client.start_game(language='en', theme='c')
         
         # Store client state
-        session['question'] = client.question
-        session['step'] = client.step
-        session['progression'] = client.progression
-        session['session_id'] = client.session_id
-        session['signature'] = client.signature
-        session['identifiant'] = client.identifiant
-        session['language'] = client.language
-        session['theme'] = client.theme
-        session['child_mode'] = client.child_mode
+        session['game'] = client.to_state()
+        new_answer_token()
         
         return redirect(url_for('game'))
     except Exception as e:
-        return render_template_string(HTML_TEMPLATE, stage='info', error=str(e))
+        return templates.render('info.html', error=str(e))
 
-@app.route('/game')
-def game():
-    if 'user_info' not in session:
-        return redirect(url_for('index'))
-    
-    if session.get('win') and not session.get('finished'):
-        return render_template_string(HTML_TEMPLATE, 
-            stage='guess',
+def new_answer_token():
+    session['token'] = secrets.token_urlsafe(12)
+    return session['token']
+
+def render_stage(client, error=None):
+    if client.win and not client.finished:
+        return templates.render('guess.html',
             user_info=session['user_info'],
-            guess=session.get('guess', {}),
-            error=session.pop('error', None)
+            guess={
+                'name': client.name_proposition,
+                'description': client.description_proposition,
+                'photo': client.photo,
+                'pseudo': client.pseudo
+            },
+            token=session.get('token') or new_answer_token(),
+            error=error
         )
     
-    if session.get('finished'):
-        return render_template_string(HTML_TEMPLATE,
-            stage='finished',
-            win=session.get('win', False),
-            name=session.get('name'),
-            description=session.get('description'),
-            photo=session.get('photo'),
-            final_message=session.get('final_message', '')
+    if client.finished:
+        return templates.render('finished.html',
+            win=client.win,
+            name=client.name_proposition if client.win else None,
+            description=client.description_proposition if client.win else None,
+            photo=client.photo if client.win else None,
+            final_message=client.question or ''
         )
     
-    return render_template_string(HTML_TEMPLATE,
-        stage='game',
+    return templates.render('game.html',
         user_info=session['user_info'],
-        question=session.get('question', ''),
-        step=session.get('step', 0),
-        progression=session.get('progression', 0),
-        error=session.pop('error', None)
+        question=client.question or '',
+        step=client.step or 0,
+        progression=client.progression or 0,
+        token=session.get('token') or new_answer_token(),
+        error=error
     )
 
+@app.route('/game')
+def game():
+    if 'user_info' not in session or 'game' not in session:
+        return redirect(url_for('index'))
+    
+    return render_stage(Client.from_state(session['game']), session.pop('error', None))
+
 @app.route('/answer', methods=['POST'])
 def answer():
-    if 'user_info' not in session:
+    if 'user_info' not in session or 'game' not in session:
         return redirect(url_for('index'))
     
     answer_value = request.form['answer']
     
-    # Handle back button
-    if answer_value == 'b':
-        return handle_back()
-    
-    # Recreate client from session
-    client = Client()
-    client.session_id = session['session_id']
-    client.signature = session['signature']
-    client.identifiant = session['identifiant']
-    client.language = session['language']
-    client.theme = session['theme']
-    client.child_mode = session['child_mode']
-    client.question = session['question']
-    client.step = session['step']
-    client.progression = session['progression']
-    client.win = session.get('win', False)
-    client.finished = session.get('finished', False)
-    
-    if session.get('win'):
-        client.id_proposition = session.get('id_proposition', '')
-        client.name_proposition = session.get('name_proposition', '')
-        client.description_proposition = session.get('description_proposition', '')
-        client.photo = session.get('photo', '')
-        client.pseudo = session.get('pseudo', '')
-        client.flag_photo = session.get('flag_photo', '')
-        client.step_last_proposition = session.get('step_last_proposition', 0)
-    
-    try:
-        client.answer(answer_value)
-        
-        # Update session with new state
-        session['question'] = str(client)
-        session['step'] = client.step
-        session['progression'] = client.progression
-        session['finished'] = client.finished
-        session['win'] = client.win
-        
-        # Handle guess
-        if client.win and not client.finished:
-            session['guess'] = {
-                'name': client.name_proposition,
-                'description': client.description_proposition,
-                'photo': client.photo,
-                'pseudo': client.pseudo
-            }
-            session['id_proposition'] = client.id_proposition
-            session['name_proposition'] = client.name_proposition
-            session['description_proposition'] = client.description_proposition
-            session['photo'] = client.photo
-            session['pseudo'] = client.pseudo
-            session['flag_photo'] = client.flag_photo
-            session['step_last_proposition'] = client.step
-        
-        # Handle finished
-        if client.finished:
-            session['final_message'] = client.question
-            if client.photo:
-                session['photo'] = client.photo
-                session['name'] = client.name_proposition
-                session['description'] = client.description_proposition
-        
+    # Each rendered form carries the session's current token, which changes with
+    # every accepted answer: a form sent twice only reaches akinator once
+    token = request.form.get('token')
+    if token is None or token != session.get('token'):
+        # Resubmitted after it was answered, or not from our form; show where the game is now
         return redirect(url_for('game'))
-        
-    except Exception as e:
-        session['error'] = str(e)
+    if not answer_claims.add(token, session.sid):
+        # Double submit while the first one is still running
+        wait_for_answer(token)
         return redirect(url_for('game'))
-
-def handle_back():
-    # Recreate client
-    client = Client()
-    client.session_id = session['session_id']
-    client.signature = session['signature']
-    client.identifiant = session['identifiant']
-    client.language = session['language']
-    client.theme = session['theme']
-    client.child_mode = session['child_mode']
-    client.question = session['question']
-    client.step = session['step']
-    client.progression = session['progression']
-    client.win = session.get('win', False)
+    g.answer_token = token
+    
+    # Rehydrate client from session
+    client = Client.from_state(session['game'])
+    error = None
     
     try:
-        client.back()
-        
-        # Update session
-        session['question'] = client.question
-        session['step'] = client.step
-        session['progression'] = client.progression
-        session['win'] = False
-        session.pop('guess', None)
+        with scrapers.bind(client):
+            # Handle back button
+            if answer_value == 'b':
+                client.back()
+                # to_state() keeps neither history nor queued calls; send a local back's now
+                client.sync()
+            else:
+                client.answer(answer_value)
         
-        return redirect(url_for('game'))
+        # Update session with new state
+        session['game'] = client.to_state()
+        new_answer_token()
     except CantGoBackAnyFurther:
-        session['error'] = "You can't go back any further!"
-        return redirect(url_for('game'))
+        error = "You can't go back any further!"
     except Exception as e:
-        session['error'] = str(e)
-        return redirect(url_for('game'))
+        error = str(e)
+    
+    if DIRECT_ANSWER:
+        return render_stage(client if error is None else Client.from_state(session['game']), error)
+    
+    if error:
+        session['error'] = error
+    return redirect(url_for('game'))
+
+def wait_for_answer(token):
+    # Until the request holding the claim saved a new token or gave the claim back, briefly
+    deadline = time.monotonic() + DUPLICATE_WAIT
+    while time.monotonic() < deadline and token in answer_claims:
+        saved = sessions.get(session.sid)
+        if saved is None or saved.get('token') != token:
+            return
+        time.sleep(0.05)
+
+@app.teardown_request
+def release_answer_token(exc):
+    # Runs after the session was saved. A used token stays claimed, in case a duplicate
+    # read the session before it was saved; one that wasn't used is free to be sent again
+    token = g.pop('answer_token', None)
+    if token is not None and session.get('token') == token:
+        answer_claims.delete(token)
 
 if __name__ == '__main__':
-    app.run(debug=True, port=5000)
\ No newline at end of file
+    app.run(debug=True, port=5000)
@@ -0,0 +1,273 @@
+# Backend: ASGI API (asgi_app.py)
+# Same /api/start, /api/answer, /api/back and /api/end contract as app.py, but the
+# handlers are async and run their games on an akihub.AkinatorHub, so one process
+# can serve many players while their requests wait on akinator.com.
+# Install: pip install uvicorn akinator.py
+# Run: uvicorn asgi_app:app --port 5000
+
+from akihub import AkinatorHub, UnknownGame
+from akiclient import HistoryDiverged
+from akinator.client import LANG_MAP, THEME_MAP
+from akinator.exceptions import CantGoBackAnyFurther, InvalidChoiceError
+from image_cache import ImageCache
+import game_events
+import ua_cache
+import asyncio
+import json
+import os
+from urllib.parse import parse_qs
+
+# Parse cloudscraper's browsers.json once per process
+ua_cache.install()
+
+SESSION_TTL = int(os.environ.get('SESSION_TTL', 900))
+SESSION_MAX_SIZE = int(os.environ.get('SESSION_MAX_SIZE', 1000))
+UPSTREAM_CONNECTIONS = int(os.environ.get('UPSTREAM_CONNECTIONS', 32))
+# Point at a mock_akinator.py server for load tests
+AKINATOR_UPSTREAM = os.environ.get('AKINATOR_UPSTREAM')
+# Send games as HTTP/2 streams over a couple of connections per host (needs pip install h2)
+UPSTREAM_HTTP2 = os.environ.get('UPSTREAM_HTTP2', '').lower() in ('1', 'true', 'yes')
+
+# Every game shares these keep-alive connections, UPSTREAM_CONNECTIONS per host
+hub = AkinatorHub(max_per_host=UPSTREAM_CONNECTIONS, ttl=SESSION_TTL, max_games=SESSION_MAX_SIZE,
+                  upstream=AKINATOR_UPSTREAM, http2=UPSTREAM_HTTP2)
+hub.games.start_reaper(interval=min(60, SESSION_TTL))
+
+# Same image proxy as app.py's /api/image; misses are fetched on a worker thread
+IMAGE_CACHE_DIR = os.environ.get('IMAGE_CACHE_DIR')
+images = ImageCache(
+    IMAGE_CACHE_DIR or None,
+    memory_bytes=int(os.environ.get('IMAGE_CACHE_MEMORY_MB', 32)) << 20,
+    disk_bytes=int(os.environ.get('IMAGE_CACHE_DISK_MB', 256)) << 20,
+)
+
+async def start_game(data):
+    name = data.get('name')
+    phone = data.get('phone')
+    institution = data.get('institution')
+    language = data.get('language', 'en')
+    theme = data.get('theme', 'c')
+    child_mode = data.get('child_mode', False)
+
+    # Same checks as app.py: the hub keeps a session and a limit per language
+    if isinstance(language, str):
+        language = LANG_MAP.get(language.lower(), language.lower())
+    if not isinstance(language, str) or language not in THEME_MAP:
+        return 400, {'success': False, 'error': 'Unknown language'}
+    if theme not in THEME_MAP[language]:
+        return 400, {'success': False, 'error': 'Theme not available for this language'}
+    if not isinstance(child_mode, bool):
+        return 400, {'success': False, 'error': 'child_mode must be true or false'}
+
+    try:
+        session_id = await hub.start(language, theme, child_mode, info={
+            'name': name,
+            'phone': phone,
+            'institution': institution
+        })
+        client = hub.get(session_id)
+
+        return 200, {
+            'success': True,
+            'session_id': session_id,
+            'question': client.question,
+            'step': client.step,
+            'progression': client.progression,
+            'akitude_url': client.akitude_url
+        }
+    except Exception as e:
+        return 500, {'success': False, 'error': str(e)}
+
+def diverged(e):
+    # The player was shown a question akinator.com isn't on; show them the one it is on
+    client = e.client
+    return 409, {
+        'success': False,
+        'error': str(e),
+        'diverged': True,
+        'question': client.question,
+        'step': client.step,
+        'progression': client.progression,
+        'akitude_url': client.akitude_url
+    }
+
+async def submit_answer(data):
+    session_id = data.get('session_id')
+    answer = data.get('answer')
+
+    try:
+        client = await hub.answer(session_id, answer)
+
+        response = {
+            'success': True,
+            'question': str(client),
+            'step': client.step,
+            'progression': client.progression,
+            'finished': client.finished,
+            'win': client.win,
+            'akitude_url': client.akitude_url
+        }
+
+        # If Akinator made a guess
+        if client.win and not client.finished:
+            response['guess'] = {
+                'name': client.name_proposition,
+                'description': client.description_proposition,
+                'photo': client.photo,
+                'pseudo': client.pseudo
+            }
+
+        # If game is finished
+        if client.finished:
+            response['final_message'] = client.question
+            if client.photo:
+                response['photo'] = client.photo
+                response['name'] = client.name_proposition
+                response['description'] = client.description_proposition
+
+        return 200, response
+    except UnknownGame:
+        return 400, {'success': False, 'error': 'Invalid session'}
+    except HistoryDiverged as e:
+        return diverged(e)
+    except InvalidChoiceError as e:
+        return 400, {'success': False, 'error': str(e)}
+    except Exception as e:
+        return 500, {'success': False, 'error': str(e)}
+
+async def go_back(data):
+    session_id = data.get('session_id')
+
+    try:
+        # Answered from history when it can; akinator.com is told in the background
+        client = await hub.back(session_id)
+        return 200, {
+            'success': True,
+            'question': client.question,
+            'step': client.step,
+            'progression': client.progression,
+            'akitude_url': client.akitude_url
+        }
+    except UnknownGame:
+        return 400, {'success': False, 'error': 'Invalid session'}
+    except HistoryDiverged as e:
+        return diverged(e)
+    except CantGoBackAnyFurther:
+        return 400, {'success': False, 'error': "You can't go back any further!"}
+    except Exception as e:
+        return 500, {'success': False, 'error': str(e)}
+
+async def end_session(data):
+    session_id = data.get('session_id')
+
+    if session_id:
+        hub.close(session_id)
+
+    return 200, {'success': True}
+
+ROUTES = {
+    '/api/start': start_game,
+    '/api/answer': submit_answer,
+    '/api/back': go_back,
+    '/api/end': end_session,
+}
+
+# Routes that answer with game_events' stream when asked for text/event-stream
+STREAMED = {submit_answer, go_back}
+
+# Same effect as flask_cors.CORS(app) in app.py
+CORS_HEADERS = [(b'access-control-allow-origin', b'*')]
+PREFLIGHT_HEADERS = CORS_HEADERS + [
+    (b'access-control-allow-methods', b'POST, OPTIONS'),
+    (b'access-control-allow-headers', b'Content-Type'),
+]
+
+async def send_json(send, status, payload, headers=CORS_HEADERS):
+    body = json.dumps(payload).encode()
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [(b'content-type', b'application/json'), (b'content-length', str(len(body)).encode())] + headers,
+    })
+    await send({'type': 'http.response.body', 'body': body})
+
+async def send_image(scope, send):
+    query = parse_qs(scope.get('query_string', b'').decode('latin-1'))
+    try:
+        width = int(query['w'][0]) if 'w' in query else None
+    except ValueError:
+        width = None
+    if_none_match = dict(scope['headers']).get(b'if-none-match', b'').decode('latin-1') or None
+    status, headers, body = await asyncio.to_thread(images.response, query.get('url', [''])[0], width, if_none_match)
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [(name.lower().encode(), value.encode()) for name, value in headers.items()]
+                   + [(b'content-length', str(len(body)).encode())] + CORS_HEADERS,
+    })
+    await send({'type': 'http.response.body', 'body': body})
+
+async def send_events(send, handler, data):
+    # game_events' stream: "thinking" before the handler awaits akinator.com, the outcome after
+    await send({
+        'type': 'http.response.start',
+        'status': 200,
+        'headers': [(b'content-type', game_events.CONTENT_TYPE.encode())]
+                   + [(name.lower().encode(), value.encode()) for name, value in game_events.HEADERS.items()]
+                   + CORS_HEADERS,
+    })
+    await send({'type': 'http.response.body', 'body': game_events.thinking(), 'more_body': True})
+    status, payload = await handler(data)
+    if status == 200:
+        body = b''.join(game_events.transitions(payload))
+    else:
+        body = game_events.error(status, payload)
+    await send({'type': 'http.response.body', 'body': body})
+
+async def read_body(receive):
+    body = b''
+    while True:
+        message = await receive()
+        body += message.get('body', b'')
+        if not message.get('more_body'):
+            return body
+
+async def lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            await hub.aclose()
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+async def app(scope, receive, send):
+    if scope['type'] == 'lifespan':
+        return await lifespan(receive, send)
+    if scope['type'] != 'http':
+        return
+
+    if scope['path'] == '/api/image' and scope['method'] == 'GET':
+        return await send_image(scope, send)
+
+    handler = ROUTES.get(scope['path'])
+    if handler is None:
+        return await send_json(send, 404, {'success': False, 'error': 'Not found'})
+    if scope['method'] == 'OPTIONS':
+        return await send_json(send, 200, {}, PREFLIGHT_HEADERS)
+    if scope['method'] != 'POST':
+        return await send_json(send, 405, {'success': False, 'error': 'Method not allowed'})
+
+    try:
+        data = json.loads(await read_body(receive) or b'null')
+    except ValueError:
+        data = None
+    if not isinstance(data, dict):
+        return await send_json(send, 400, {'success': False, 'error': 'Expected a JSON object'})
+
+    if handler in STREAMED and game_events.wanted(dict(scope['headers']).get(b'accept', b'').decode('latin-1')):
+        return await send_events(send, handler, data)
+
+    status, payload = await handler(data)
+    await send_json(send, status, payload)
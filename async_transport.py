@@ -0,0 +1,660 @@
+# async_transport.py - Non-blocking HTTP transport for akinator.AsyncClient
+# Speaks HTTP/1.1 over asyncio streams with the same cipher suite, headers and
+# cookie handling as cloudscraper's CipherSuiteAdapter, so one event loop can drive
+# thousands of games without a thread per in-flight request.
+# With http2=True the same TLS handshake also offers h2 by ALPN. Hosts that pick it
+# get every request as a stream on a few shared connections, instead of one socket
+# per request in flight. Hosts that don't stay on HTTP/1.1.
+# Install (optional, for http2=True): pip install h2
+#
+# Usage:
+#     pool = AsyncConnectionPool()
+#     client = AsyncClient(session=pool.session())
+#
+# Note: Cloudflare challenge pages are not solved here; akinator.com does not
+# normally serve them, and a challenge surfaces as a 403/503 from raise_for_status().
+
+import asyncio
+import gzip
+import json as _json
+import ssl
+import time
+import zlib
+from collections import OrderedDict
+from http import HTTPStatus
+from http.cookies import SimpleCookie
+from urllib.parse import urlencode, urljoin, urlsplit
+
+from cloudscraper.user_agent import User_Agent
+from requests.exceptions import ConnectionError, ConnectTimeout, HTTPError, ReadTimeout, TooManyRedirects
+from requests.structures import CaseInsensitiveDict
+
+try:
+    import h2.config
+    import h2.connection
+    import h2.errors
+    import h2.events
+    import h2.exceptions
+except ImportError:
+    h2 = None
+
+MAX_REDIRECTS = 10
+
+# HTTP/2 frame type of GOAWAY
+_GOAWAY = 0x7
+
+# Connection-specific headers, which HTTP/2 forbids
+_HOP_HEADERS = frozenset(('connection', 'host', 'keep-alive', 'proxy-connection', 'transfer-encoding', 'upgrade'))
+
+
+class NewConnectionError(ConnectionError):
+    """No connection could be opened, so nothing was sent (safe to retry)."""
+
+
+def create_ssl_context(cipher_suite, ecdh_curve='prime256v1'):
+    """Build the same TLS context `CipherSuiteAdapter` does."""
+    context = ssl.create_default_context(ssl.Purpose.SERVER_AUTH)
+    context.set_ciphers(cipher_suite)
+    context.set_ecdh_curve(ecdh_curve)
+    context.minimum_version = ssl.TLSVersion.TLSv1_2
+    context.maximum_version = ssl.TLSVersion.TLSv1_3
+    return context
+
+
+def _split_timeout(timeout, default):
+    if timeout is None:
+        return default
+    if isinstance(timeout, tuple):
+        return timeout
+    return timeout, timeout
+
+
+class AsyncResponse:
+    """The subset of `requests.Response` that the akinator clients use."""
+
+    def __init__(self, status_code, reason, headers, content, url, cookies=()):
+        self.status_code = status_code
+        self.reason = reason
+        self.headers = headers
+        self.content = content
+        self.url = url
+        self.set_cookies = list(cookies)
+        self.encoding = None
+        content_type = headers.get('Content-Type', '')
+        for param in content_type.split(';')[1:]:
+            key, _, value = param.strip().partition('=')
+            if key.lower() == 'charset':
+                self.encoding = value.strip('"\'')
+
+    @property
+    def ok(self):
+        return self.status_code < 400
+
+    @property
+    def text(self):
+        return self.content.decode(self.encoding or 'utf-8', errors='replace')
+
+    def json(self, **kwargs):
+        return _json.loads(self.content, **kwargs)
+
+    def raise_for_status(self):
+        if 400 <= self.status_code < 600:
+            kind = 'Client' if self.status_code < 500 else 'Server'
+            raise HTTPError(f'{self.status_code} {kind} Error: {self.reason} for url: {self.url}', response=self)
+
+    def __repr__(self):
+        return f'<AsyncResponse [{self.status_code}]>'
+
+
+class _Connection:
+    __slots__ = ('reader', 'writer', 'last_used')
+
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+        self.last_used = time.monotonic()
+
+    def usable(self, keepalive):
+        return (not self.writer.is_closing() and not self.reader.at_eof()
+                and time.monotonic() - self.last_used < keepalive)
+
+    def close(self):
+        self.writer.close()
+
+
+class _Refused(NewConnectionError):
+    """The server did not process the request (GOAWAY or REFUSED_STREAM), so it can be resent."""
+
+
+class _Dropped(ConnectionError):
+    """The connection closed before the response began, as it does when a server times out an idle one."""
+
+
+class _Stream:
+    __slots__ = ('headers', 'data', 'response')
+
+    def __init__(self, loop):
+        self.headers = ()
+        self.data = []
+        self.response = loop.create_future()
+
+    def finish(self):
+        if not self.response.done():
+            self.response.set_result((self.headers, b''.join(self.data)))
+
+    def fail(self, error):
+        if not self.response.done():
+            self.response.set_exception(error)
+
+
+class _H2Connection:
+    """An HTTP/2 connection; every request is a stream on it, many in flight at once."""
+
+    def __init__(self, reader, writer, max_streams):
+        self.reader = reader
+        self.writer = writer
+        self.max_streams = max_streams
+        self.reserved = 0          # streams handed out by the pool and not yet released
+        self.last_used = time.monotonic()
+        self.closed = False
+        self.goaway = False        # the server said which streams it will still answer
+        self.h2 = h2.connection.H2Connection(h2.config.H2Configuration(client_side=True, header_encoding='utf-8'))
+        self.h2.initiate_connection()
+        self.writer.write(self.h2.data_to_send())
+        self._streams = {}         # stream id -> _Stream
+        self._window = asyncio.Event()
+        self._reading = asyncio.ensure_future(self._read())
+
+    @property
+    def free(self):
+        return not self.closed and self.reserved < min(self.max_streams, self.h2.remote_settings.max_concurrent_streams)
+
+    def usable(self, keepalive):
+        return (not self.closed and not self.writer.is_closing()
+                and (self.reserved or time.monotonic() - self.last_used < keepalive))
+
+    async def request(self, method, authority, target, headers, body, timeout):
+        """Send one request as a new stream; returns `(header fields, body)` of the response."""
+        fields = [(':method', method), (':scheme', 'https'), (':authority', authority), (':path', target)]
+        fields += [(name.lower(), str(value)) for name, value in headers.items() if name.lower() not in _HOP_HEADERS]
+        if body or method in ('POST', 'PUT', 'PATCH'):
+            fields.append(('content-length', str(len(body))))
+        if self.closed:
+            raise _Refused('HTTP/2 connection is closing')
+        try:
+            stream_id = self.h2.get_next_available_stream_id()
+            self.h2.send_headers(stream_id, fields, end_stream=not body)
+        except h2.exceptions.ProtocolError as e:
+            raise _Refused(f'No new stream on the HTTP/2 connection: {e}') from e
+        stream = self._streams[stream_id] = _Stream(asyncio.get_running_loop())
+        try:
+            self.writer.write(self.h2.data_to_send())
+            while body:
+                window = min(self.h2.local_flow_control_window(stream_id), self.h2.max_outbound_frame_size)
+                if window <= 0:
+                    self._window.clear()
+                    await self._window.wait()
+                    continue
+                chunk, body = body[:window], body[window:]
+                self.h2.send_data(stream_id, chunk, end_stream=not body)
+                self.writer.write(self.h2.data_to_send())
+            await self.writer.drain()
+            return await asyncio.wait_for(stream.response, timeout)
+        except asyncio.TimeoutError:
+            self._reset(stream_id)
+            raise ReadTimeout(f'Read timed out after {timeout}s: https://{authority}{target}')
+        except asyncio.CancelledError:
+            # The server need not go on sending an answer nobody reads
+            self._reset(stream_id)
+            raise
+        except (h2.exceptions.ProtocolError, OSError) as e:
+            if stream.response.done():
+                # Failed by the read loop, which knows why
+                return stream.response.result()
+            dropped = isinstance(e, (ConnectionResetError, BrokenPipeError))
+            raise (_Dropped if dropped else ConnectionError)(f'HTTP/2 connection to {authority} failed: {e}') from e
+        finally:
+            self._streams.pop(stream_id, None)
+            self.last_used = time.monotonic()
+
+    def _reset(self, stream_id):
+        try:
+            self.h2.reset_stream(stream_id, h2.errors.ErrorCodes.CANCEL)
+            self.writer.write(self.h2.data_to_send())
+        except h2.exceptions.ProtocolError:
+            pass
+
+    async def _read(self):
+        error = None
+        pending = bytearray()
+        try:
+            while True:
+                data = await self.reader.read(65536)
+                if not data:
+                    break
+                pending += data
+                for event in self.h2.receive_data(self._without_goaway(pending)):
+                    self._handle(event)
+                self.writer.write(self.h2.data_to_send())
+        except Exception as e:
+            error = e
+        self._fail(error)
+
+    def _without_goaway(self, pending):
+        # h2 rejects every frame after a GOAWAY, which would fail the streams the server
+        # still answers; so complete frames are passed on here minus GOAWAYs, handled below
+        frames = bytearray()
+        while len(pending) >= 9:
+            size = 9 + int.from_bytes(pending[:3], 'big')
+            if len(pending) < size:
+                break
+            if pending[3] == _GOAWAY:
+                self._goaway(int.from_bytes(pending[9:13], 'big') & 0x7fffffff)
+            else:
+                frames += pending[:size]
+            del pending[:size]
+        return bytes(frames)
+
+    def _goaway(self, last_stream_id):
+        # Streams above last_stream_id were never processed; the rest still finish
+        self.closed = True
+        self.goaway = True
+        for stream_id, stream in list(self._streams.items()):
+            if stream_id > last_stream_id:
+                stream.fail(_Refused('Server is closing the connection (GOAWAY)'))
+
+    def _handle(self, event):
+        stream = self._streams.get(getattr(event, 'stream_id', None))
+        if isinstance(event, h2.events.ResponseReceived):
+            if stream is not None:
+                stream.headers = event.headers
+        elif isinstance(event, h2.events.DataReceived):
+            self.h2.acknowledge_received_data(event.flow_controlled_length, event.stream_id)
+            if stream is not None:
+                stream.data.append(event.data)
+        elif isinstance(event, h2.events.StreamEnded):
+            if stream is not None:
+                stream.finish()
+        elif isinstance(event, h2.events.StreamReset):
+            if stream is not None:
+                refused = event.error_code == h2.errors.ErrorCodes.REFUSED_STREAM
+                stream.fail((_Refused if refused else ConnectionError)(f'Stream reset by the server ({event.error_code!r})'))
+        elif isinstance(event, (h2.events.WindowUpdated, h2.events.RemoteSettingsChanged)):
+            self._window.set()
+
+    def _fail(self, error):
+        self.closed = True
+        self._window.set()
+        # After a GOAWAY the server may have processed what it didn't answer; never resend that
+        dropped = not self.goaway and (error is None or isinstance(error, (ConnectionResetError, BrokenPipeError)))
+        for stream in self._streams.values():
+            kind = _Dropped if dropped and not stream.headers else ConnectionError
+            stream.fail(kind(f'HTTP/2 connection closed: {error or "EOF"}'))
+        self.writer.close()
+
+    def close(self):
+        if not self.closed:
+            self.closed = True
+            try:
+                self.h2.close_connection()
+                self.writer.write(self.h2.data_to_send())
+            except (h2.exceptions.ProtocolError, OSError):
+                pass
+        self.writer.close()
+
+
+def _h2_response(fields, content, url):
+    headers = CaseInsensitiveDict()
+    cookies = []
+    status = 0
+    for name, value in fields:
+        if name == ':status':
+            status = int(value)
+        elif name == 'set-cookie':
+            cookies.append(value)
+        elif name in headers:
+            headers[name] += ', ' + value
+        else:
+            headers[name] = value
+    try:
+        reason = HTTPStatus(status).phrase
+    except ValueError:
+        reason = ''
+    return AsyncResponse(status, reason, headers, content, url, cookies)
+
+
+class AsyncConnectionPool:
+    """
+    Keep-alive connections shared by every `AsyncSession` created from it.
+
+    :param browser: Passed to cloudscraper's `User_Agent`, e.g. `{'browser': 'chrome'}`.
+    :param max_per_host: Maximum concurrent connections per host.
+    :param keepalive: Seconds an idle connection is kept before being dropped.
+    :param timeout: Default `(connect, read)` timeout in seconds.
+    :param upstream: Optional base URL every request is sent to instead, for load tests.
+    :param http2: Offer HTTP/2 to https hosts (needs h2; ignored without it).
+    :param http2_connections: HTTP/2 connections per host that requests are multiplexed over.
+    :param http2_streams: Requests in flight per HTTP/2 connection, at most.
+    """
+
+    def __init__(self, browser=None, max_per_host=10, keepalive=60, timeout=(10, 30), ecdh_curve='prime256v1',
+                 upstream=None, http2=False, http2_connections=2, http2_streams=100):
+        user_agent = User_Agent(allow_brotli=False, browser=browser)
+        self.headers = user_agent.headers
+        self.cipher_suite = ':'.join(user_agent.cipherSuite)
+        self.ssl_context = create_ssl_context(self.cipher_suite, ecdh_curve)
+        self.max_per_host = max_per_host
+        self.keepalive = keepalive
+        self.timeout = _split_timeout(timeout, (10, 30))
+        self.upstream = urlsplit(upstream) if upstream else None
+        self.http2 = http2 and h2 is not None
+        self.http2_connections = http2_connections
+        self.http2_streams = http2_streams
+        self._idle = {}    # (scheme, host, port) -> [_Connection, ...]
+        self._limits = {}  # (scheme, host, port) -> asyncio.Semaphore
+        if self.http2:
+            # Same handshake, plus h2 offered by ALPN
+            self.h2_ssl_context = create_ssl_context(self.cipher_suite, ecdh_curve)
+            self.h2_ssl_context.set_alpn_protocols(['h2', 'http/1.1'])
+        self._h2 = {}           # (scheme, host, port) -> [_H2Connection, ...]
+        self._h2_ready = {}     # (scheme, host, port) -> asyncio.Condition, notified as streams free up
+        self._h2_opening = {}   # (scheme, host, port) -> HTTP/2 connections being opened
+        self._http1_hosts = set()  # hosts that answered the ALPN offer with HTTP/1.1
+
+    def session(self):
+        """Return a new cookie-isolated session that shares this pool's connections."""
+        return AsyncSession(self)
+
+    async def request(self, method, url, headers, body=b'', timeout=None):
+        parts = urlsplit(url)
+        if self.upstream:
+            parts = parts._replace(scheme=self.upstream.scheme, netloc=self.upstream.netloc)
+        scheme = parts.scheme
+        port = parts.port or (443 if scheme == 'https' else 80)
+        key = (scheme, parts.hostname, port)
+        target = parts.path or '/'
+        if parts.query:
+            target += '?' + parts.query
+        connect_timeout, read_timeout = _split_timeout(timeout, self.timeout)
+
+        if self.http2 and scheme == 'https' and key not in self._http1_hosts:
+            response = await self._request_h2(key, method, url, parts.netloc, target, headers, body,
+                                              connect_timeout, read_timeout)
+            if response is not None:
+                return response
+
+        head = [f'{method} {target} HTTP/1.1', f'Host: {parts.netloc}']
+        head += [f'{name}: {value}' for name, value in headers.items()]
+        if body or method in ('POST', 'PUT', 'PATCH'):
+            head.append(f'Content-Length: {len(body)}')
+        payload = ('\r\n'.join(head) + '\r\n\r\n').encode('latin-1') + body
+
+        limit = self._limits.get(key)
+        if limit is None:
+            limit = self._limits[key] = asyncio.Semaphore(self.max_per_host)
+
+        async with limit:
+            for attempt in (0, 1):
+                connection, reused = await self._checkout(key, connect_timeout)
+                try:
+                    connection.writer.write(payload)
+                    await connection.writer.drain()
+                    response, reusable = await asyncio.wait_for(
+                        _read_response(connection.reader, method, url), read_timeout)
+                except asyncio.TimeoutError:
+                    connection.close()
+                    raise ReadTimeout(f'Read timed out after {read_timeout}s: {url}')
+                except (OSError, asyncio.IncompleteReadError, EOFError) as e:
+                    connection.close()
+                    # A kept-alive connection the server already closed; retry once on a fresh one
+                    if reused and not attempt and (type(e) is EOFError or isinstance(e, (ConnectionResetError, BrokenPipeError))):
+                        continue
+                    raise ConnectionError(f'Connection to {parts.hostname} failed: {e}') from e
+                except BaseException:
+                    # Cancelled, or a response that would not parse: the connection is mid-exchange
+                    connection.close()
+                    raise
+                if reusable:
+                    connection.last_used = time.monotonic()
+                    self._idle.setdefault(key, []).append(connection)
+                else:
+                    connection.close()
+                return response
+
+    async def _checkout(self, key, timeout):
+        idle = self._idle.get(key)
+        while idle:
+            connection = idle.pop()
+            if connection.usable(self.keepalive):
+                return connection, True
+            connection.close()
+
+        reader, writer = await self._open(key, timeout, self.ssl_context)
+        return _Connection(reader, writer), False
+
+    async def _open(self, key, timeout, ssl_context):
+        scheme, host, port = key
+        try:
+            return await asyncio.wait_for(asyncio.open_connection(
+                host, port,
+                ssl=ssl_context if scheme == 'https' else None,
+                server_hostname=host if scheme == 'https' else None,
+            ), timeout)
+        except asyncio.TimeoutError:
+            raise ConnectTimeout(f'Connection to {host} timed out after {timeout}s')
+        except OSError as e:
+            raise NewConnectionError(f'Connection to {host} failed: {e}') from e
+
+    async def _request_h2(self, key, method, url, authority, target, headers, body, connect_timeout, read_timeout):
+        # None if the host turned out to speak HTTP/1.1 only
+        for attempt in (0, 1):
+            connection, reused = await self._h2_checkout(key, connect_timeout)
+            if connection is None:
+                return None
+            try:
+                fields, content = await connection.request(method, authority, target, headers, body, read_timeout)
+            except _Refused:
+                # Never processed, so safe to send again on another connection
+                if attempt:
+                    raise
+                continue
+            except _Dropped:
+                # A kept-alive connection the server already closed; retry once, as HTTP/1.1 does
+                if reused and not attempt:
+                    continue
+                raise
+            finally:
+                await self._h2_release(key, connection)
+            return _h2_response(fields, content, url)
+
+    async def _h2_checkout(self, key, timeout):
+        ready = self._h2_ready.get(key)
+        if ready is None:
+            ready = self._h2_ready[key] = asyncio.Condition()
+        async with ready:
+            while True:
+                if key in self._http1_hosts:
+                    return None, False
+                connections = self._h2.setdefault(key, [])
+                for connection in [connection for connection in connections if not connection.usable(self.keepalive)]:
+                    # One that got a GOAWAY still finishes its streams; _h2_release closes it after
+                    connections.remove(connection)
+                    if not connection.reserved:
+                        connection.close()
+                for connection in connections:
+                    if connection.free:
+                        connection.reserved += 1
+                        return connection, True
+                if len(connections) + self._h2_opening.get(key, 0) < self.http2_connections:
+                    break
+                await ready.wait()
+            # Hold a slot while the handshake runs, without holding up the host's other requests
+            self._h2_opening[key] = self._h2_opening.get(key, 0) + 1
+
+        try:
+            reader, writer = await self._open(key, timeout, self.h2_ssl_context)
+        except BaseException:
+            async with ready:
+                self._h2_opening[key] -= 1
+                ready.notify()
+            raise
+        async with ready:
+            self._h2_opening[key] -= 1
+            ready.notify_all()
+            if writer.get_extra_info('ssl_object').selected_alpn_protocol() != 'h2':
+                # Fall back for good; this connection serves the HTTP/1.1 request
+                self._http1_hosts.add(key)
+                self._idle.setdefault(key, []).append(_Connection(reader, writer))
+                return None, False
+            connection = _H2Connection(reader, writer, self.http2_streams)
+            connection.reserved += 1
+            self._h2.setdefault(key, []).append(connection)
+            return connection, False
+
+    async def _h2_release(self, key, connection):
+        connection.reserved -= 1
+        if connection.closed and not connection.reserved:
+            connection.close()
+        ready = self._h2_ready[key]
+        async with ready:
+            ready.notify()
+
+    async def close(self):
+        idle, self._idle = self._idle, {}
+        for connections in idle.values():
+            for connection in connections:
+                connection.close()
+        multiplexed, self._h2 = self._h2, {}
+        for connections in multiplexed.values():
+            for connection in connections:
+                connection.close()
+
+
+class AsyncSession:
+    """
+    Per-game view of an `AsyncConnectionPool`: own headers and cookies, shared sockets.
+
+    Drop-in replacement for `akinator.async_client.AsyncCloudScraper`.
+    """
+
+    def __init__(self, pool):
+        self.pool = pool
+        self.headers = OrderedDict(pool.headers)
+        self.cookies = {}     # domain -> {name: value}; a '.domain' key also covers its subdomains
+
+    async def get(self, url, **kwargs):
+        return await self.request('GET', url, **kwargs)
+
+    async def post(self, url, data=None, json=None, **kwargs):
+        return await self.request('POST', url, data=data, json=json, **kwargs)
+
+    async def request(self, method, url, data=None, json=None, headers=None, allow_redirects=True, timeout=None):
+        body = b''
+        request_headers = OrderedDict(self.headers)
+        if json is not None:
+            body = _json.dumps(json).encode()
+            request_headers['Content-Type'] = 'application/json'
+        elif data is not None:
+            body = data if isinstance(data, bytes) else urlencode(data).encode()
+            request_headers['Content-Type'] = 'application/x-www-form-urlencoded'
+        if headers:
+            request_headers.update(headers)
+
+        for _ in range(MAX_REDIRECTS + 1):
+            host = (urlsplit(url).hostname or '').lower()
+            sent = request_headers
+            cookie = self._cookie_header(host)
+            if cookie:
+                sent = OrderedDict(request_headers)
+                sent['Cookie'] = cookie
+            response = await self.pool.request(method, url, sent, body, timeout)
+            self._store_cookies(host, response.set_cookies)
+            if not allow_redirects or response.status_code not in (301, 302, 303, 307, 308):
+                return _decode(response)
+            url = urljoin(url, response.headers['Location'])
+            if response.status_code in (301, 302, 303) and method != 'HEAD':
+                method, body = 'GET', b''
+                request_headers.pop('Content-Type', None)
+        raise TooManyRedirects(f'Exceeded {MAX_REDIRECTS} redirects.')
+
+    def _cookie_header(self, host):
+        cookies = {}
+        for domain, jar in self.cookies.items():
+            if domain == host or domain.startswith('.') and (host == domain[1:] or host.endswith(domain)):
+                cookies.update(jar)
+        return '; '.join(f'{name}={value}' for name, value in cookies.items())
+
+    def _store_cookies(self, host, set_cookies):
+        for header in set_cookies:
+            cookie = SimpleCookie()
+            cookie.load(header)
+            for name, morsel in cookie.items():
+                domain = morsel['domain'].lower().lstrip('.')
+                if not domain:
+                    key = host
+                elif host == domain or host.endswith('.' + domain):
+                    key = '.' + domain
+                else:
+                    # A host only sets cookies for itself and the domains above it
+                    continue
+                self.cookies.setdefault(key, {})[name] = morsel.value
+
+    async def close(self):
+        self.cookies.clear()
+
+
+def _decode(response):
+    encoding = response.headers.get('Content-Encoding', '').lower()
+    if encoding == 'gzip':
+        response.content = gzip.decompress(response.content)
+    elif encoding == 'deflate':
+        try:
+            response.content = zlib.decompress(response.content)
+        except zlib.error:
+            response.content = zlib.decompress(response.content, -zlib.MAX_WBITS)
+    return response
+
+
+async def _read_response(reader, method, url):
+    status_line = await reader.readline()
+    if not status_line:
+        raise EOFError('Server closed the connection')
+    version, status, reason = (status_line.decode('latin-1').rstrip('\r\n').split(' ', 2) + [''])[:3]
+    status = int(status)
+
+    headers = CaseInsensitiveDict()
+    cookies = []
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b'\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        name, value = name.strip(), value.strip()
+        if name.lower() == 'set-cookie':
+            cookies.append(value)
+        elif name in headers:
+            headers[name] += ', ' + value
+        else:
+            headers[name] = value
+
+    reusable = version == 'HTTP/1.1' and 'close' not in headers.get('Connection', '').lower()
+    if method == 'HEAD' or status in (204, 304) or 100 <= status < 200:
+        content = b''
+    elif 'chunked' in headers.get('Transfer-Encoding', '').lower():
+        chunks = []
+        while True:
+            size = int((await reader.readline()).split(b';', 1)[0], 16)
+            if size == 0:
+                while (await reader.readline()) not in (b'\r\n', b'\n', b''):
+                    pass
+                break
+            chunks.append(await reader.readexactly(size))
+            await reader.readexactly(2)
+        content = b''.join(chunks)
+    elif 'Content-Length' in headers:
+        content = await reader.readexactly(int(headers['Content-Length']))
+    else:
+        content = await reader.read()
+        reusable = False
+
+    return AsyncResponse(status, reason, headers, content, url, cookies), reusable
@@ -0,0 +1,103 @@
+# bench_sessions.py - Bytes held per idle game session, before and after GameState
+# Plays games offline through akiprotocol with mock_akinator's pages, leaves them
+# idle a few answers in, and measures with tracemalloc what each one keeps alive:
+#   akinator.Client + own scraper  the original app: a dict per game, owning a CloudScraper
+#   akinator.Client, no session    the same dict once the scraper pool took the transport
+#   akiclient.Akinator             slotted GameState, interned strings, no transport
+#
+# Run: python bench_sessions.py --sessions 2000 --answers 5 > bench_output.txt
+
+import argparse
+import gc
+import html
+import json
+import random
+import tracemalloc
+import uuid
+
+import akinator
+from cloudscraper import create_scraper
+
+from akiclient import Akinator
+from akiprotocol import GameState
+import mock_akinator
+
+ANSWERS = ['y', 'n', 'i', 'p', 'pn']
+
+
+def _start_page():
+    return mock_akinator.GAME_PAGE.format(
+        session=random.randint(10 ** 6, 10 ** 7), signature=uuid.uuid4().hex,
+        identifiant=random.randint(10 ** 8, 10 ** 9), question=html.escape(mock_akinator.QUESTIONS[0]),
+        padding='',
+    ).encode()
+
+
+def _question(step):
+    return json.dumps({
+        'completion': 'OK',
+        'akitude': mock_akinator.AKITUDES[min(step // 4, len(mock_akinator.AKITUDES) - 1)],
+        'step': str(step),
+        'progression': f'{random.uniform(0, 99):.5f}',
+        'question': mock_akinator.QUESTIONS[step % len(mock_akinator.QUESTIONS)],
+        'question_id': str(step + 1),
+    }).encode()
+
+
+def play(answers):
+    """An idle `Akinator`, `answers` questions in, as app.py keeps it between requests."""
+    game = Akinator(session=object())
+    game.receive(game.start_request(language='en', theme='c'), 200, _start_page())
+    for step in range(1, answers + 1):
+        game.receive(game.answer_request(random.choice(ANSWERS)), 200, _question(step))
+    game.session = None
+    return game
+
+
+def _copy(value):
+    # A string of its own, as json.loads/the page scraper gave every old client
+    return value[:1] + value[1:] if isinstance(value, str) and len(value) > 1 else value
+
+
+def as_dict_client(game, session):
+    client = akinator.Client.__new__(akinator.Client)
+    client.session = session
+    for name in GameState.FIELDS:
+        setattr(client, name, _copy(getattr(game, name)))
+    client.history = [tuple(_copy(value) for value in snapshot) for snapshot in game.history or ()]
+    del client._pending
+    return client
+
+
+def measure(build, count):
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    sessions = [build() for _ in range(count)]
+    gc.collect()
+    used = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    del sessions
+    return used / count
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure memory per idle game session')
+    parser.add_argument('--sessions', type=int, default=2000)
+    parser.add_argument('--answers', type=int, default=5, help='questions answered before the game goes idle')
+    parser.add_argument('--scraper-sessions', type=int, default=100, help='sessions for the scraper-owning case, which is slow to build')
+    args = parser.parse_args()
+
+    rows = [
+        ('akinator.Client + own scraper', measure(lambda: as_dict_client(play(args.answers), create_scraper()), args.scraper_sessions)),
+        ('akinator.Client, no session', measure(lambda: as_dict_client(play(args.answers), None), args.sessions)),
+        ('akiclient.Akinator (GameState)', measure(lambda: play(args.answers), args.sessions)),
+    ]
+    print(f'Bytes per idle session, {args.answers} answers in:')
+    for name, size in rows:
+        print(f'  {name:32} {size:10,.0f}')
+    print(f'  {"GameState vs dict client":32} {rows[1][1] / rows[2][1]:9.1f}x smaller')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,45 @@
+# game_events.py - Server-sent events for /api/answer and /api/back
+# A client that sends `Accept: text/event-stream` gets an event stream back instead
+# of one JSON document. A "thinking" event goes out as soon as the request has been
+# read, while akinator.com is still being called, so the UI can show the answer as
+# taken right away. "progression" and then one of "question", "guess" or "finished"
+# follow once akinator answers. An "error" event is sent instead if the call fails.
+# Each event after "thinking" carries the same payload as the JSON response would,
+# so a client can treat the last one exactly like that response.
+# The stream ends with the call. It holds a worker thread no longer than the JSON
+# request would have, and fetch() sends every answer on the same keep-alive connection.
+
+import json
+
+CONTENT_TYPE = 'text/event-stream'
+
+# Stop nginx and friends from buffering the stream until it ends
+HEADERS = {'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+
+
+def wanted(accept):
+    """True if an Accept header asks for an event stream."""
+    return CONTENT_TYPE in (accept or '')
+
+
+def event(name, data):
+    return f'event: {name}\ndata: {json.dumps(data)}\n\n'.encode()
+
+
+def thinking():
+    return event('thinking', {})
+
+
+def error(status, payload):
+    return event('error', dict(payload, status=status))
+
+
+def transitions(payload):
+    """The events for a successful answer/back `payload`, in the order they are sent."""
+    yield event('progression', {'step': payload['step'], 'progression': payload['progression']})
+    if payload.get('finished'):
+        yield event('finished', payload)
+    elif 'guess' in payload:
+        yield event('guess', payload)
+    else:
+        yield event('question', payload)
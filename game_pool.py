@@ -0,0 +1,121 @@
+# game_pool.py - Games started ahead of time, so /api/start doesn't wait on akinator.com
+# A background thread keeps `size` started games per (language, theme, child_mode)
+# and tops the pool up again as games are handed out. A game that sat unused for
+# `max_age` seconds is dropped before akinator.com would answer it with
+# "KO - TIMEOUT"; unused games cost akinator nothing to abandon.
+# The thread runs in the process that hands games out: it is started by the first
+# take() or after a fork into a worker, never in serve.py's preloading master.
+
+import os
+import threading
+import time
+import weakref
+from collections import deque
+
+from akiclient import Akinator
+
+
+class GamePool:
+    """
+    Pre-started `Akinator` games, keyed by `(language, theme, child_mode)`.
+
+    :param scrapers: The `ScraperPool` games are started on.
+    :param keys: The `(language, theme, child_mode)` combinations to keep ready.
+    :param size: Games kept ready per key.
+    :param max_age: Seconds after which an unused game is dropped.
+    :param retry_delay: Seconds to wait before trying again after a failed start.
+    """
+
+    def __init__(self, scrapers, keys=(('en', 'c', False),), size=2, max_age=240, retry_delay=5):
+        self.scrapers = scrapers
+        self.keys = [tuple(key) for key in keys]
+        self.size = size
+        self.max_age = max_age
+        self.retry_delay = retry_delay
+        self._games = {key: deque() for key in self.keys}  # key -> deque of (started_at, client)
+        self._cond = threading.Condition()
+        self._stopped = False
+        self._wanted = False
+        self._thread = None
+        if hasattr(os, 'register_at_fork'):
+            after_fork = weakref.WeakMethod(self._after_fork)
+            os.register_at_fork(after_in_child=lambda: after_fork() and after_fork()())
+
+    def take(self, language='en', theme='c', child_mode=False):
+        """Return a ready game for the key, or None if there is none."""
+        key = (language, theme, bool(child_mode))
+        now = time.monotonic()
+        with self._cond:
+            self._run_thread()
+            games = self._games.get(key)
+            while games:
+                started_at, client = games.popleft()
+                if now - started_at < self.max_age:
+                    self._cond.notify()
+                    return client
+            self._cond.notify()
+        return None
+
+    def start(self):
+        """Fill the pool from a daemon thread, started on the first `take()` or after a fork."""
+        with self._cond:
+            self._stopped = False
+            self._wanted = True
+        return self
+
+    def stop(self):
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+
+    def __len__(self):
+        with self._cond:
+            return sum(len(games) for games in self._games.values())
+
+    def _run_thread(self):
+        # Called with the lock held
+        if self._wanted and not self._stopped and (self._thread is None or not self._thread.is_alive()):
+            self._thread = threading.Thread(target=self._run, name='game-pool', daemon=True)
+            self._thread.start()
+
+    def _missing(self):
+        # Called with the lock held: drop expired games, return the first key that is short
+        deadline = time.monotonic() - self.max_age
+        for key in self.keys:
+            games = self._games[key]
+            while games and games[0][0] <= deadline:
+                games.popleft()
+            if len(games) < self.size:
+                return key
+        return None
+
+    def _run(self):
+        while True:
+            with self._cond:
+                key = self._missing()
+                while key is None and not self._stopped:
+                    # Wake up when a game is taken, or when the oldest one is about to expire
+                    oldest = min((games[0][0] for games in self._games.values() if games), default=time.monotonic())
+                    self._cond.wait(max(0.1, oldest + self.max_age - time.monotonic()))
+                    key = self._missing()
+                if self._stopped:
+                    return
+            language, theme, child_mode = key
+            try:
+                with self.scrapers.lease(language) as scraper:
+                    client = Akinator(session=scraper)
+                    client.start_game(language=language, theme=theme, child_mode=child_mode)
+                    client.session = None
+            except Exception:
+                time.sleep(self.retry_delay)
+                continue
+            with self._cond:
+                self._games[key].append((time.monotonic(), client))
+
+    def _after_fork(self):
+        # Games started by a preloading master would be handed out by every worker
+        self._games = {key: deque() for key in self.keys}
+        self._cond = threading.Condition()
+        self._thread = None
+        with self._cond:
+            self._run_thread()
@@ -0,0 +1,345 @@
+# image_cache.py - Local caching proxy for akitude images and character photos
+# Every player's browser used to fetch the same few akitude images and photos from
+# akinator.com itself. Served through ImageCache they come from memory (or disk after
+# a restart), each fetched upstream once per max-age and revalidated with its ETag.
+# Only https URLs on ALLOWED_HOSTS are fetched, redirects are checked against the same
+# list and only image/* bodies are served, so the proxy can't be pointed at anything else.
+# Install (optional, for ?w= downscaling): pip install Pillow
+
+import hashlib
+import io
+import json
+import os
+import re
+import stat
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from urllib.parse import urljoin, urlsplit
+
+import requests
+from cloudscraper import create_scraper
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+# Where akinator.com serves akitudes and character photos from
+ALLOWED_HOSTS = ('.akinator.com', 'photos.clarinea.fr')
+
+# ?w= is rounded up to one of these, so the cache holds a few variants per image
+WIDTHS = (64, 128, 256, 512, 1024)
+
+MAX_REDIRECTS = 3
+
+# While upstream fails, a stale image is served for this many seconds before it is tried again
+STALE_RETRY = 30
+
+
+# The only meta keys a cached file may carry, as CachedImage.meta() writes them
+META_KEYS = frozenset(('content_type', 'etag', 'last_modified', 'max_age', 'fetched_at'))
+
+
+class ImageError(Exception):
+    """An image that can't be served; `status` is the HTTP status to answer with."""
+
+    def __init__(self, message, status=502):
+        super().__init__(message)
+        self.status = status
+
+
+class CachedImage:
+    __slots__ = ('body', 'content_type', 'etag', 'last_modified', 'max_age', 'fetched_at')
+
+    def __init__(self, body, content_type, etag=None, last_modified=None, max_age=0, fetched_at=None):
+        self.body = body
+        self.content_type = content_type
+        self.etag = etag
+        self.last_modified = last_modified
+        self.max_age = max_age
+        self.fetched_at = time.time() if fetched_at is None else fetched_at
+
+    @property
+    def ttl(self):
+        return int(self.fetched_at + self.max_age - time.time())
+
+    def meta(self):
+        return {name: getattr(self, name) for name in self.__slots__ if name != 'body'}
+
+
+def allowed(url, hosts=ALLOWED_HOSTS):
+    parts = urlsplit(url)
+    host = (parts.hostname or '').lower()
+    if parts.scheme != 'https' or parts.username or parts.password or parts.port not in (None, 443):
+        return False
+    return any(host.endswith(allowed) if allowed.startswith('.') else host == allowed for allowed in hosts)
+
+
+def _opaque(tag):
+    # If-None-Match compares weakly: W/"x" matches "x"
+    tag = tag.strip()
+    return tag[2:] if tag.startswith('W/') else tag
+
+
+def _etag_matches(etag, if_none_match):
+    # If-None-Match is "*" (any current image) or a comma-separated list of entity tags
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == '*':
+        return True
+    return bool(etag) and _opaque(etag) in {_opaque(tag) for tag in if_none_match.split(',')}
+
+
+def _private_dir(path):
+    # Whatever is on disk here is served from the app's own origin; only this user may write it
+    os.makedirs(path, mode=0o700, exist_ok=True)
+    if not hasattr(os, 'getuid'):
+        return path
+    info = os.lstat(path)
+    if not stat.S_ISDIR(info.st_mode) or info.st_uid != os.getuid() or stat.S_IMODE(info.st_mode) != 0o700:
+        raise RuntimeError(f'Image cache directory {path!r} must be a directory owned by this user with mode 0700.')
+    return path
+
+
+def _valid_meta(meta):
+    return (isinstance(meta, dict) and META_KEYS.issuperset(meta)
+            and isinstance(meta.get('content_type'), str) and meta['content_type'].startswith('image/')
+            and all(isinstance(meta.get(name), (str, type(None))) for name in ('etag', 'last_modified'))
+            and all(isinstance(meta.get(name, 0), (int, float)) for name in ('max_age', 'fetched_at')))
+
+
+def _max_age(cache_control, default):
+    match = re.search(r'max-age=(\d+)', cache_control or '')
+    if 'no-store' in (cache_control or '') or 'no-cache' in (cache_control or ''):
+        return 0
+    return int(match.group(1)) if match else default
+
+
+class ImageCache:
+    """
+    A bounded memory + disk LRU of proxied images.
+
+    :param directory: Where cached images are kept on disk, or None for memory only.
+        It is created with mode 0700 and refused if another user owns it or could write to it.
+    :param memory_bytes: Size bound of the in-memory LRU.
+    :param disk_bytes: Size bound of the on-disk LRU.
+    :param hosts: Hosts that may be fetched (a leading dot matches subdomains).
+    :param max_image_bytes: Larger upstream bodies are refused.
+    :param default_max_age: Freshness, in seconds, when upstream sends no max-age.
+    :param timeout: `(connect, read)` timeout of upstream fetches.
+    :param session: Session to fetch with; a CloudScraper, like the game pages, by default.
+    """
+
+    def __init__(self, directory=None, memory_bytes=32 << 20, disk_bytes=256 << 20, hosts=ALLOWED_HOSTS,
+                 max_image_bytes=5 << 20, default_max_age=86400, timeout=(5, 15), session=None):
+        self.directory = directory
+        self.memory_bytes = memory_bytes
+        self.disk_bytes = disk_bytes
+        self.hosts = hosts
+        self.max_image_bytes = max_image_bytes
+        self.default_max_age = default_max_age
+        self.timeout = timeout
+        self.session = session or create_scraper()
+        self._memory = OrderedDict()  # key -> CachedImage, least recently used first
+        self._memory_size = 0
+        self._disk = OrderedDict()    # key -> file size, least recently used first
+        self._disk_size = 0
+        self._lock = threading.Lock()
+        self._fetching = {}           # key -> Lock, so one miss fetches and the rest wait
+        if directory:
+            _private_dir(directory)
+            files = [entry for entry in os.scandir(directory) if entry.name.endswith('.img')]
+            for entry in sorted(files, key=lambda entry: entry.stat().st_mtime):
+                size = entry.stat().st_size
+                self._disk[entry.name[:-4]] = size
+                self._disk_size += size
+
+    def get(self, url, width=None):
+        """Return the `CachedImage` for `url`, downscaled to `width` if Pillow is installed."""
+        if not allowed(url, self.hosts):
+            raise ImageError('Image host not allowed.', 403)
+        if width:
+            width = next((size for size in WIDTHS if size >= width), WIDTHS[-1])
+        if Image is None:
+            width = None
+        key = hashlib.sha256(f'{url}|{width or ""}'.encode()).hexdigest()
+
+        image = self._lookup(key)
+        if image is not None and image.ttl > 0:
+            return image
+
+        with self._lock:
+            fetching = self._fetching.setdefault(key, threading.Lock())
+        with fetching:
+            # Someone else may have fetched it while we waited
+            current = self._lookup(key)
+            if current is not None and current.ttl > 0:
+                return current
+            try:
+                if width:
+                    original = self.get(url)
+                    image = CachedImage(self._downscale(original.body, width), original.content_type, None,
+                                        original.last_modified, original.max_age, original.fetched_at)
+                    if image.body is original.body:
+                        image.etag = original.etag
+                    else:
+                        image.etag = '"%s"' % hashlib.sha256(image.body).hexdigest()[:32]
+                else:
+                    image = self._fetch(url, current)
+                self._store(key, image)
+                return image
+            finally:
+                with self._lock:
+                    self._fetching.pop(key, None)
+
+    def response(self, url, width=None, if_none_match=None):
+        """`(status, headers, body)` to answer a proxy request with."""
+        try:
+            image = self.get(url, width)
+        except ImageError as e:
+            return e.status, {'Content-Type': 'text/plain', 'Cache-Control': 'no-store'}, str(e).encode()
+        headers = {
+            'Content-Type': image.content_type,
+            'Cache-Control': f'public, max-age={max(0, image.ttl)}',
+            'X-Content-Type-Options': 'nosniff',
+        }
+        if image.etag:
+            headers['ETag'] = image.etag
+        if image.last_modified:
+            headers['Last-Modified'] = image.last_modified
+        if _etag_matches(image.etag, if_none_match):
+            return 304, headers, b''
+        return 200, headers, image.body
+
+    def _fetch(self, url, stale=None):
+        headers = {}
+        if stale is not None and stale.etag:
+            headers['If-None-Match'] = stale.etag
+        elif stale is not None and stale.last_modified:
+            headers['If-Modified-Since'] = stale.last_modified
+        try:
+            for _ in range(MAX_REDIRECTS + 1):
+                with self.session.get(url, headers=headers, timeout=self.timeout, allow_redirects=False, stream=True) as response:
+                    if response.is_redirect:
+                        url = urljoin(url, response.headers['Location'])
+                        if not allowed(url, self.hosts):
+                            raise ImageError('Image redirected to a host that is not allowed.', 403)
+                        continue
+                    max_age = _max_age(response.headers.get('Cache-Control'), self.default_max_age)
+                    if response.status_code == 304 and stale is not None:
+                        return CachedImage(stale.body, stale.content_type, stale.etag, stale.last_modified, max_age)
+                    if response.status_code != 200:
+                        raise ImageError(f'Upstream answered {response.status_code}.', 404 if response.status_code == 404 else 502)
+                    content_type = response.headers.get('Content-Type', '').split(';')[0].strip()
+                    if not content_type.startswith('image/'):
+                        raise ImageError('Upstream did not send an image.')
+                    body = bytearray()
+                    for chunk in response.iter_content(65536):
+                        body += chunk
+                        if len(body) > self.max_image_bytes:
+                            raise ImageError('Image too large.')
+                    body = bytes(body)
+                    etag = response.headers.get('ETag') or '"%s"' % hashlib.sha256(body).hexdigest()[:32]
+                    return CachedImage(body, content_type, etag, response.headers.get('Last-Modified'), max_age)
+        except requests.RequestException as e:
+            if stale is not None:
+                # Better an old image than none while upstream is unreachable; fresh for a
+                # little while, so each request doesn't wait out the upstream timeout again
+                return CachedImage(stale.body, stale.content_type, stale.etag, stale.last_modified, STALE_RETRY)
+            raise ImageError(f'Failed to fetch the image: {e}') from e
+        raise ImageError('Too many redirects.')
+
+    @staticmethod
+    def _downscale(body, width):
+        try:
+            with Image.open(io.BytesIO(body)) as image:
+                if image.width <= width:
+                    return body
+                height = max(1, round(image.height * width / image.width))
+                resized = image.resize((width, height), Image.LANCZOS)
+                out = io.BytesIO()
+                if image.format == 'JPEG':
+                    resized.convert('RGB').save(out, 'JPEG', quality=85, optimize=True)
+                else:
+                    resized.save(out, image.format or 'PNG', optimize=True)
+                return out.getvalue()
+        except Exception:
+            return body
+
+    def _lookup(self, key):
+        with self._lock:
+            image = self._memory.get(key)
+            if image is not None:
+                self._memory.move_to_end(key)
+                return image
+            on_disk = key in self._disk
+        if on_disk:
+            image = self._read(key)
+            if image is not None:
+                self._remember(key, image)
+            return image
+        return None
+
+    def _store(self, key, image):
+        self._remember(key, image)
+        if self.directory:
+            self._write(key, image)
+
+    def _remember(self, key, image):
+        if len(image.body) > self.memory_bytes:
+            return
+        with self._lock:
+            old = self._memory.pop(key, None)
+            if old is not None:
+                self._memory_size -= len(old.body)
+            self._memory[key] = image
+            self._memory_size += len(image.body)
+            while self._memory_size > self.memory_bytes:
+                _, evicted = self._memory.popitem(last=False)
+                self._memory_size -= len(evicted.body)
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + '.img')
+
+    def _read(self, key):
+        try:
+            with open(self._path(key), 'rb') as f:
+                meta = json.loads(f.readline())
+                body = f.read()
+            if not _valid_meta(meta):
+                raise ValueError(f'Unexpected meta in {key}.img')
+            image = CachedImage(body, **meta)
+            os.utime(self._path(key))
+        except (OSError, ValueError, TypeError):
+            with self._lock:
+                self._disk_size -= self._disk.pop(key, 0)
+            return None
+        with self._lock:
+            if key in self._disk:
+                self._disk.move_to_end(key)
+        return image
+
+    def _write(self, key, image):
+        data = json.dumps(image.meta()).encode() + b'\n' + image.body
+        try:
+            fd, temp = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(temp, self._path(key))
+        except OSError:
+            return
+        evicted = []
+        with self._lock:
+            self._disk_size += len(data) - self._disk.pop(key, 0)
+            self._disk[key] = len(data)
+            while self._disk_size > self.disk_bytes and len(self._disk) > 1:
+                old, size = self._disk.popitem(last=False)
+                self._disk_size -= size
+                evicted.append(old)
+        for old in evicted:
+            try:
+                os.remove(self._path(old))
+            except OSError:
+                pass
@@ -3,6 +3,45 @@ import { Brain, User, Phone, Building2, ArrowLeft, Sparkles, AlertCircle } from
 
 const API_BASE = 'http://localhost:5000/api';
 
+// Akinator images go through the API's caching proxy instead of straight to akinator.com
+const imageUrl = (url, width) =>
+  url ? `${API_BASE}/image?url=${encodeURIComponent(url)}${width ? `&w=${width}` : ''}` : null;
+
+// POSTs to /answer and /back ask for the event stream (see game_events.py) and call
+// onEvent(name, data) per event: 'thinking' right away, then the outcome. A backend
+// that answers with plain JSON is handled too: its document is passed as 'result'.
+const postEvents = async (path, body, onEvent) => {
+  const response = await fetch(`${API_BASE}${path}`, {
+    method: 'POST',
+    headers: { 'Content-Type': 'application/json', 'Accept': 'text/event-stream' },
+    body: JSON.stringify(body)
+  });
+  if (!(response.headers.get('Content-Type') || '').startsWith('text/event-stream')) {
+    onEvent('result', await response.json());
+    return;
+  }
+  const reader = response.body.getReader();
+  const decoder = new TextDecoder();
+  let buffered = '';
+  for (;;) {
+    const { done, value } = await reader.read();
+    if (done) break;
+    buffered += decoder.decode(value, { stream: true });
+    let end;
+    while ((end = buffered.indexOf('\n\n')) !== -1) {
+      const block = buffered.slice(0, end);
+      buffered = buffered.slice(end + 2);
+      let name = 'message';
+      let data = '';
+      for (const line of block.split('\n')) {
+        if (line.startsWith('event: ')) name = line.slice(7);
+        else if (line.startsWith('data: ')) data += line.slice(6);
+      }
+      onEvent(name, data ? JSON.parse(data) : {});
+    }
+  }
+};
+
 const AkinatorGame = () => {
   const [stage, setStage] = useState('info');
   const [userInfo, setUserInfo] = useState({ name: '', phone: '', institution: '' });
@@ -21,6 +60,7 @@ const AkinatorGame = () => {
     akitudeUrl: null
   });
   const [loading, setLoading] = useState(false);
+  const [thinking, setThinking] = useState(false);
   const [error, setError] = useState(null);
 
   const startGame = async () => {
@@ -54,7 +94,7 @@ const AkinatorGame = () => {
           finished: false,
           win: false,
           guess: null,
-          akitudeUrl: data.akitude_url
+          akitudeUrl: imageUrl(data.akitude_url)
         });
         setStage('game');
       } else {
@@ -67,19 +107,26 @@ const AkinatorGame = () => {
     }
   };
 
+  // A back the server answered from its history turned out to disagree with akinator.com:
+  // the error carries the question akinator is really on
+  const showDiverged = (data) => {
+    setGameState(prev => ({
+      ...prev,
+      question: data.question,
+      step: data.step,
+      progression: data.progression,
+      win: false,
+      guess: null,
+      akitudeUrl: imageUrl(data.akitude_url)
+    }));
+  };
+
   const sendAnswer = async (answer) => {
     setLoading(true);
     setError(null);
     
-    try {
-      const response = await fetch(`${API_BASE}/answer`, {
-        method: 'POST',
-        headers: { 'Content-Type': 'application/json' },
-        body: JSON.stringify({ session_id: sessionId, answer })
-      });
-      
-      const data = await response.json();
-      
+    const showResult = (data) => {
+      setThinking(false);
       if (data.success) {
         setGameState({
           question: data.question,
@@ -92,14 +139,28 @@ const AkinatorGame = () => {
           photo: data.photo || null,
           akinatorName: data.name || null,
           description: data.description || null,
-          akitudeUrl: data.akitude_url
+          akitudeUrl: imageUrl(data.akitude_url)
         });
       } else {
+        if (data.diverged) showDiverged(data);
         setError(data.error || 'Failed to submit answer');
       }
+    };
+    
+    try {
+      await postEvents('/answer', { session_id: sessionId, answer }, (name, data) => {
+        if (name === 'thinking') {
+          setThinking(true);
+        } else if (name === 'progression') {
+          setGameState(prev => ({ ...prev, progression: data.progression }));
+        } else {
+          showResult(data);
+        }
+      });
     } catch (err) {
       setError('Failed to connect to server');
     } finally {
+      setThinking(false);
       setLoading(false);
     }
   };
@@ -109,30 +170,30 @@ const AkinatorGame = () => {
     setError(null);
     
     try {
-      const response = await fetch(`${API_BASE}/back`, {
-        method: 'POST',
-        headers: { 'Content-Type': 'application/json' },
-        body: JSON.stringify({ session_id: sessionId })
+      await postEvents('/back', { session_id: sessionId }, (name, data) => {
+        if (name === 'thinking') {
+          setThinking(true);
+        } else if (name === 'progression') {
+          setGameState(prev => ({ ...prev, progression: data.progression }));
+        } else if (data.success) {
+          setGameState(prev => ({
+            ...prev,
+            question: data.question,
+            step: data.step,
+            progression: data.progression,
+            win: false,
+            guess: null,
+            akitudeUrl: imageUrl(data.akitude_url)
+          }));
+        } else {
+          if (data.diverged) showDiverged(data);
+          setError(data.error || "Can't go back any further!");
+        }
       });
-      
-      const data = await response.json();
-      
-      if (data.success) {
-        setGameState(prev => ({
-          ...prev,
-          question: data.question,
-          step: data.step,
-          progression: data.progression,
-          win: false,
-          guess: null,
-          akitudeUrl: data.akitude_url
-        }));
-      } else {
-        setError(data.error || "Can't go back any further!");
-      }
     } catch (err) {
       setError('Failed to connect to server');
     } finally {
+      setThinking(false);
       setLoading(false);
     }
   };
@@ -248,7 +309,7 @@ const AkinatorGame = () => {
           {gameState.photo && (
             <div className="bg-gradient-to-br from-indigo-50 to-purple-50 rounded-2xl p-6 mb-6">
               <img
-                src={gameState.photo}
+                src={imageUrl(gameState.photo, 256)}
                 alt={gameState.akinatorName}
                 className="w-32 h-32 rounded-full mx-auto mb-4 object-cover border-4 border-white shadow-lg"
                 onError={(e) => { e.target.style.display = 'none'; }}
@@ -287,7 +348,7 @@ const AkinatorGame = () => {
           <div className="bg-gradient-to-br from-indigo-50 to-purple-50 rounded-2xl p-6 mb-6 text-center">
             {gameState.guess.photo && (
               <img
-                src={gameState.guess.photo}
+                src={imageUrl(gameState.guess.photo, 256)}
                 alt={gameState.guess.name}
                 className="w-32 h-32 rounded-full mx-auto mb-4 object-cover border-4 border-white shadow-lg"
                 onError={(e) => { e.target.style.display = 'none'; }}
@@ -357,9 +418,12 @@ const AkinatorGame = () => {
 
         <div className="mb-8">
           <div className="bg-gradient-to-br from-indigo-50 to-purple-50 rounded-2xl p-8 mb-6">
-            <p className="text-2xl font-semibold text-gray-800 text-center">
+            <p className={`text-2xl font-semibold text-gray-800 text-center transition-opacity ${thinking ? 'opacity-40' : ''}`}>
               {gameState.question}
             </p>
+            {thinking && (
+              <p className="text-sm text-indigo-600 text-center mt-3">Hmm, let me think...</p>
+            )}
           </div>
 
           {error && (
@@ -0,0 +1,151 @@
+# loadtest.py - Plays scripted games against app.py / asgi_app.py / app001.py
+# Reports p50/p95/p99 latency per endpoint and completed games per second.
+#
+# 1. python mock_akinator.py --port 8001 --latency 0.15
+# 2. AKINATOR_UPSTREAM=http://127.0.0.1:8001 python app.py        (or app001.py, or uvicorn asgi_app:app)
+# 3. python loadtest.py --app api --games 200 --concurrency 20     (--app web for app001.py)
+
+from concurrent.futures import ThreadPoolExecutor
+import argparse
+import random
+import re
+import threading
+import time
+
+import requests
+
+ANSWERS = ['y', 'n', 'i', 'p', 'pn']
+
+# Give up on a game that hasn't finished after this many answers
+MAX_ANSWERS = 80
+
+# app001.py only takes an answer with the token of the form it was given on
+TOKEN = re.compile(r'name="token" value="([^"]*)"')
+
+
+class Recorder:
+    def __init__(self):
+        self.timings = {}
+        self.errors = {}
+        self.games = 0
+        self.lock = threading.Lock()
+
+    def time(self, name, call, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            response = call(*args, **kwargs)
+        except requests.RequestException as e:
+            self.error(name, type(e).__name__)
+            raise
+        elapsed = time.perf_counter() - start
+        with self.lock:
+            self.timings.setdefault(name, []).append(elapsed)
+        if response.status_code >= 400:
+            self.error(name, f'HTTP {response.status_code}')
+        return response
+
+    def error(self, name, kind):
+        with self.lock:
+            key = (name, kind)
+            self.errors[key] = self.errors.get(key, 0) + 1
+
+    def finished(self):
+        with self.lock:
+            self.games += 1
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(fraction * (len(values) - 1))))]
+
+
+def play_api(base, recorder, rng, back_rate):
+    http = requests.Session()
+    data = recorder.time('/api/start', http.post, f'{base}/api/start', json={
+        'name': 'Load test', 'phone': '9999999999', 'institution': 'Bench', 'language': 'en', 'theme': 'c',
+    }).json()
+    if not data.get('success'):
+        return
+    session_id = data['session_id']
+    step = data['step']
+    try:
+        for _ in range(MAX_ANSWERS):
+            if step > 0 and rng.random() < back_rate:
+                data = recorder.time('/api/back', http.post, f'{base}/api/back', json={'session_id': session_id}).json()
+            else:
+                answer = 'y' if data.get('win') else rng.choice(ANSWERS)
+                data = recorder.time('/api/answer', http.post, f'{base}/api/answer', json={
+                    'session_id': session_id, 'answer': answer,
+                }).json()
+            if not data.get('success'):
+                return
+            step = data.get('step', step)
+            if data.get('finished'):
+                recorder.finished()
+                return
+    finally:
+        recorder.time('/api/end', http.post, f'{base}/api/end', json={'session_id': session_id})
+
+
+def play_web(base, recorder, rng, back_rate):
+    http = requests.Session()
+    page = recorder.time('/start', http.post, f'{base}/start', data={
+        'name': 'Load test', 'phone': '9999999999', 'institution': 'Bench',
+    }).text
+    step = 0
+    for _ in range(MAX_ANSWERS):
+        if 'Play Again' in page:
+            recorder.finished()
+            return
+        if 'Is this your character?' in page:
+            answer = 'y'
+        elif step > 0 and rng.random() < back_rate:
+            answer = 'b'
+        else:
+            answer = rng.choice(ANSWERS)
+        step += -1 if answer == 'b' else 1
+        token = TOKEN.search(page)
+        # Includes the redirect to /game, which is what the player waits for
+        page = recorder.time('/answer', http.post, f'{base}/answer', data={
+            'answer': answer, 'token': token.group(1) if token else '',
+        }).text
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Load test the Akinator apps')
+    parser.add_argument('--target', default='http://127.0.0.1:5000')
+    parser.add_argument('--app', choices=['api', 'web'], default='api', help='api: app.py/asgi_app.py, web: app001.py')
+    parser.add_argument('--games', type=int, default=100)
+    parser.add_argument('--concurrency', type=int, default=10)
+    parser.add_argument('--back-rate', type=float, default=0.05, help='chance of pressing back instead of answering')
+    parser.add_argument('--seed', type=int, default=None)
+    args = parser.parse_args()
+
+    play = play_api if args.app == 'api' else play_web
+    recorder = Recorder()
+    seeds = random.Random(args.seed)
+
+    def run(_):
+        try:
+            play(args.target.rstrip('/'), recorder, random.Random(seeds.random()), args.back_rate)
+        except (requests.RequestException, ValueError):
+            pass
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(args.concurrency) as executor:
+        list(executor.map(run, range(args.games)))
+    elapsed = time.perf_counter() - start
+
+    print(f'{recorder.games}/{args.games} games finished in {elapsed:.1f}s '
+          f'({recorder.games / elapsed:.2f} games/s, concurrency {args.concurrency})')
+    print(f'{"endpoint":<14}{"count":>8}{"p50 ms":>10}{"p95 ms":>10}{"p99 ms":>10}{"max ms":>10}')
+    for name, values in sorted(recorder.timings.items()):
+        print(f'{name:<14}{len(values):>8}' + ''.join(
+            f'{percentile(values, q) * 1000:>10.1f}' for q in (0.5, 0.95, 0.99)
+        ) + f'{max(values) * 1000:>10.1f}')
+    for (name, kind), count in sorted(recorder.errors.items()):
+        print(f'error: {name} {kind} x{count}')
+
+
+if __name__ == '__main__':
+    main()
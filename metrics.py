@@ -0,0 +1,234 @@
+# metrics.py - Latency histograms for the API and its akinator.com calls
+# Exposed in the Prometheus text format, e.g. on app.py's /metrics.
+#
+# Each akinator.com call is split into phases:
+#   dns      resolving {lang}.akinator.com (only when a new connection is opened)
+#   connect  TCP connect
+#   tls      TLS handshake
+#   ttfb     sending the request until the response headers arrived
+#   body     reading the body, plus cloudscraper's Cloudflare checks
+#   parse    json.loads() of the body (the streamed HTML pages are parsed as they
+#            are read, so for start_game/choose that time is part of `body`)
+# Observing a value is a bisect and a few additions under a lock.
+
+import socket
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.exceptions import NewConnectionError
+from urllib3.util.connection import allowed_gai_family
+
+# Seconds; akinator.com answers in 100-500 ms, a local phase takes microseconds
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+REGISTRY = []
+
+
+def _format(value):
+    return repr(float(value)) if value != float('inf') else '+Inf'
+
+
+def _labels(names, values, extra=''):
+    pairs = [f'{name}="{value}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+class Histogram:
+    """A Prometheus histogram with fixed buckets, one series per label tuple."""
+
+    def __init__(self, name, documentation, labelnames=(), buckets=BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._series = {}  # labels -> [per-bucket counts, sum, count]
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def observe(self, value, *labels):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    @contextmanager
+    def time(self, *labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, *labels)
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            series = [(labels, list(counts), total, count) for labels, (counts, total, count) in self._series.items()]
+        for labels, counts, total, count in sorted(series):
+            cumulative = 0
+            for bound, bucket in zip(self.buckets + (float('inf'),), counts):
+                cumulative += bucket
+                le = _labels(self.labelnames, labels, f'le="{_format(bound)}"')
+                lines.append(f'{self.name}_bucket{le} {cumulative}')
+            lines.append(f'{self.name}_sum{_labels(self.labelnames, labels)} {total}')
+            lines.append(f'{self.name}_count{_labels(self.labelnames, labels)} {count}')
+        return '\n'.join(lines)
+
+
+class Gauge:
+    """A value read from `function` at scrape time, so updating it costs nothing."""
+
+    def __init__(self, name, documentation, function, kind='gauge'):
+        self.name = name
+        self.documentation = documentation
+        self.function = function
+        self.kind = kind
+        REGISTRY.append(self)
+
+    def render(self):
+        return f'# HELP {self.name} {self.documentation}\n# TYPE {self.name} {self.kind}\n{self.name} {self.function()}'
+
+
+def render():
+    return '\n'.join(metric.render() for metric in REGISTRY) + '\n'
+
+
+HANDLER_SECONDS = Histogram('aki_handler_seconds', 'Time spent in API route handlers.', ('route',))
+UPSTREAM_SECONDS = Histogram('aki_upstream_seconds', 'Total time of akinator.com calls.', ('call',))
+UPSTREAM_PHASE_SECONDS = Histogram('aki_upstream_phase_seconds', 'akinator.com call time by phase.', ('call', 'phase'))
+
+_local = threading.local()
+
+
+@contextmanager
+def upstream(call):
+    """
+    Times one akinator.com call. Calls made inside it (e.g. `answer` going on to
+    `choose`) are counted as part of the outer one.
+    """
+    if getattr(_local, 'phases', None) is not None:
+        yield
+        return
+    phases = _local.phases = {}
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        total = time.perf_counter() - start
+        _local.phases = None
+        UPSTREAM_SECONDS.observe(total, call)
+        elapsed = phases.pop('elapsed', None)
+        if elapsed is not None:
+            # requests' `elapsed` runs from sending the request to parsing the headers,
+            # including any new connection
+            phases['ttfb'] = max(0.0, elapsed - phases.get('dns', 0) - phases.get('connect', 0) - phases.get('tls', 0))
+            phases['body'] = max(0.0, total - elapsed - phases.get('parse', 0))
+        for phase, seconds in phases.items():
+            UPSTREAM_PHASE_SECONDS.observe(seconds, call, phase)
+
+
+def phase(name, seconds):
+    """Add `seconds` to a phase of the current `upstream()` call, if any."""
+    phases = getattr(_local, 'phases', None)
+    if phases is not None:
+        phases[name] = phases.get(name, 0) + seconds
+
+
+def response(response):
+    """Record the request/headers part of an akinator.com response."""
+    phase('elapsed', response.elapsed.total_seconds())
+
+
+class _TimedConnection:
+    def _new_conn(self):
+        # Resolve here so DNS and TCP connect are timed apart, then let urllib3 connect
+        # to that address. If it refuses, fall back to the name and urllib3's own loop
+        # over every address.
+        host = self._dns_host
+        start = time.perf_counter()
+        try:
+            address = socket.getaddrinfo(host, self.port, allowed_gai_family(), socket.SOCK_STREAM)[0][4][0]
+        except OSError:
+            address = None
+        resolved = time.perf_counter()
+        phase('dns', resolved - start)
+        try:
+            if address is not None:
+                self._dns_host = address
+                try:
+                    return super()._new_conn()
+                except NewConnectionError:
+                    pass
+                finally:
+                    self._dns_host = host
+            return super()._new_conn()
+        finally:
+            self._connected_at = time.perf_counter()
+            phase('connect', self._connected_at - resolved)
+
+
+class TimedHTTPConnection(_TimedConnection, HTTPConnection):
+    pass
+
+
+class TimedHTTPSConnection(_TimedConnection, HTTPSConnection):
+    def connect(self):
+        self._connected_at = None
+        try:
+            super().connect()
+        finally:
+            if self._connected_at is not None:
+                phase('tls', time.perf_counter() - self._connected_at)
+
+
+class TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = TimedHTTPConnection
+
+
+class TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = TimedHTTPSConnection
+
+
+POOL_CLASSES = {'http': TimedHTTPConnectionPool, 'https': TimedHTTPSConnectionPool}
+
+
+def instrument_session(session):
+    """Make a requests/cloudscraper session's new connections report dns/connect/tls."""
+    for adapter in set(session.adapters.values()):
+        adapter.poolmanager.pool_classes_by_scheme = POOL_CLASSES
+    return session
+
+
+def init_app(app, path='/metrics'):
+    """Time every Flask route and serve the registry on `path`."""
+    from flask import Response, g, request
+
+    @app.before_request
+    def start_timer():
+        g.metrics_start = time.perf_counter()
+
+    @app.after_request
+    def stop_timer(response):
+        start = g.pop('metrics_start', None)
+        rule = request.url_rule
+        if start is None or rule is None or rule.rule == path:
+            return response
+        if response.is_streamed:
+            # The body is produced after this returns, e.g. a stream of events; time it
+            # until the server is done sending it
+            route = rule.rule
+            response.call_on_close(lambda: HANDLER_SECONDS.observe(time.perf_counter() - start, route))
+        else:
+            HANDLER_SECONDS.observe(time.perf_counter() - start, rule.rule)
+        return response
+
+    app.add_url_rule(path, 'metrics', lambda: Response(render(), mimetype='text/plain; version=0.0.4'))
@@ -0,0 +1,251 @@
+# mock_akinator.py - Local stand-in for {lang}.akinator.com, for load testing
+# Serves /game, /answer, /cancel_answer, /exclude and /choice with the same HTML and
+# JSON shapes akinator.Client parses, plus configurable latency and error injection.
+#
+# Run: python mock_akinator.py --port 8001 --latency 0.15 --error-rate 0.01
+# Then start the app with AKINATOR_UPSTREAM=http://127.0.0.1:8001 and run loadtest.py.
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+import argparse
+import html
+import json
+import random
+import threading
+import time
+import uuid
+
+QUESTIONS = [
+    'Is your character a real person?',
+    'Is your character a man?',
+    'Is your character from a video game?',
+    'Is your character older than 30?',
+    'Does your character wear glasses?',
+    'Is your character known for singing?',
+    'Has your character ever been in a movie?',
+    'Does your character have superpowers?',
+    'Is your character from Asia?',
+    "Is your character's name longer than 8 letters?",
+]
+
+AKITUDES = ['defi.png', 'serein.png', 'inspiration_legere.png', 'inspiration_forte.png', 'confiant.png']
+
+GAME_PAGE = """<!DOCTYPE html>
+<html lang="en">
+<head>
+<meta charset="utf-8">
+<title>Akinator</title>
+<script>
+$(function() {{
+    $('#session').val('{session}');
+    $('#signature').val('{signature}');
+    $('#identifiant').val('{identifiant}');
+}});
+</script>
+</head>
+<body>
+<div class="bubble-body"><p class="question-text" id="question-label">{question}</p></div>
+<div class="sub-bubble-propose"><p id="p-sub-bubble">I think of</p></div>
+{padding}
+</body>
+</html>
+"""
+
+CHOICE_PAGE = """<!DOCTYPE html>
+<html lang="en">
+<head>
+<meta charset="utf-8">
+<script>
+let tokenDejaJoue = "Played";
+let timesSelected = "{times}";
+</script>
+</head>
+<body>
+<span class="win-sentence">Great, guessed right one more time !</span>
+<span class="times"><span id="timesselected"></span>
+    times</span>
+{padding}
+</body>
+</html>
+"""
+
+# Real pages are ~60 KB of markup; pad ours so the scrapers do comparable work
+PADDING = '<div class="filler">' + 'x' * 100 + '</div>\n'
+
+
+class Game:
+    __slots__ = ('signature', 'identifiant', 'step', 'progression', 'guess_at', 'lock')
+
+    def __init__(self, guess_at):
+        self.signature = uuid.uuid4().hex
+        self.identifiant = str(random.randint(10 ** 8, 10 ** 9))
+        self.step = 0
+        self.progression = 0.0
+        self.guess_at = guess_at
+        self.lock = threading.Lock()
+
+
+class MockAkinator(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 1024
+
+    def __init__(self, address, latency=0.0, jitter=0.0, error_rate=0.0, timeout_rate=0.0, guess_after=12, page_kb=60):
+        super().__init__(address, Handler)
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.timeout_rate = timeout_rate
+        self.guess_after = guess_after
+        self.padding = PADDING * (page_kb * 1024 // len(PADDING))
+        self.games = {}
+        self.lock = threading.Lock()
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # Headers and body are written separately; without this, Nagle + delayed ACK add ~40 ms
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_HEAD(self):
+        self.send_body(404, b'', 'text/plain')
+
+    def do_POST(self):
+        server = self.server
+        length = int(self.headers.get('Content-Length') or 0)
+        form = {key: values[0] for key, values in parse_qs(self.rfile.read(length).decode()).items()}
+
+        delay = server.latency + random.uniform(-server.jitter, server.jitter)
+        if delay > 0:
+            time.sleep(delay)
+
+        if random.random() < server.error_rate:
+            return self.send_body(503, b'<html><body>Service Unavailable</body></html>', 'text/html')
+
+        route = {
+            '/game': self.new_game,
+            '/answer': self.answer,
+            '/cancel_answer': self.cancel_answer,
+            '/exclude': self.exclude,
+            '/choice': self.choice,
+        }.get(self.path)
+        if route is None:
+            return self.send_body(404, b'Not found', 'text/plain')
+        route(form)
+
+    def send_body(self, status, body, content_type):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_json(self, payload):
+        self.send_body(200, json.dumps(payload).encode(), 'application/json')
+
+    def lookup(self, form):
+        game = self.server.games.get(form.get('session'))
+        if game is None or random.random() < self.server.timeout_rate:
+            self.send_json({'completion': 'KO - TIMEOUT'})
+            return None
+        return game
+
+    def question(self, game):
+        return {
+            'completion': 'OK',
+            'akitude': AKITUDES[min(int(game.progression // 20), len(AKITUDES) - 1)],
+            'step': str(game.step),
+            'progression': f'{game.progression:.5f}',
+            'question': QUESTIONS[game.step % len(QUESTIONS)],
+            'question_id': str(game.step + 1),
+        }
+
+    def new_game(self, form):
+        session = str(random.randint(10 ** 6, 10 ** 7))
+        game = Game(self.server.guess_after)
+        with self.server.lock:
+            self.server.games[session] = game
+        page = GAME_PAGE.format(
+            session=session, signature=game.signature, identifiant=game.identifiant,
+            question=html.escape(QUESTIONS[0]), padding=self.server.padding,
+        )
+        self.send_body(200, page.encode(), 'text/html; charset=utf-8')
+
+    def answer(self, form):
+        game = self.lookup(form)
+        if game is None:
+            return
+        with game.lock:
+            game.step += 1
+            game.progression = min(99.0, game.progression + random.uniform(3, 12))
+            if game.step >= game.guess_at:
+                game.guess_at = game.step + 5
+                return self.send_json({
+                    'completion': 'OK',
+                    'id_proposition': str(random.randint(1, 10 ** 6)),
+                    'id_base_proposition': str(random.randint(1, 10 ** 6)),
+                    'valide_contrainte': '1',
+                    'name_proposition': 'Mario',
+                    'description_proposition': 'Video game character',
+                    'ranking': '12',
+                    'pseudo': 'mock',
+                    'nb_elements': 1,
+                    'flag_photo': 0,
+                    'photo': 'https://photos.clarinea.fr/BL_25_en/600/partenaire/m/1000_mario.jpg',
+                })
+            self.send_json(self.question(game))
+
+    def cancel_answer(self, form):
+        game = self.lookup(form)
+        if game is None:
+            return
+        with game.lock:
+            game.step = max(0, game.step - 1)
+            game.progression = max(0.0, game.progression - 5)
+            self.send_json(self.question(game))
+
+    def exclude(self, form):
+        game = self.lookup(form)
+        if game is None:
+            return
+        with game.lock:
+            game.step += 1
+            self.send_json(self.question(game))
+
+    def choice(self, form):
+        game = self.lookup(form)
+        if game is None:
+            return
+        with self.server.lock:
+            self.server.games.pop(form.get('session'), None)
+        page = CHOICE_PAGE.format(times=random.randint(1, 10 ** 5), padding=self.server.padding)
+        self.send_body(200, page.encode(), 'text/html; charset=utf-8')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Local stand-in for akinator.com')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8001)
+    parser.add_argument('--latency', type=float, default=0.0, help='seconds added to every response')
+    parser.add_argument('--jitter', type=float, default=0.0, help='+/- seconds of random latency')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='fraction of requests answered with 503')
+    parser.add_argument('--timeout-rate', type=float, default=0.0, help='fraction of requests answered with KO - TIMEOUT')
+    parser.add_argument('--guess-after', type=int, default=12, help='questions before the first proposition')
+    parser.add_argument('--page-kb', type=int, default=60, help='approximate size of the HTML pages')
+    args = parser.parse_args()
+
+    server = MockAkinator(
+        (args.host, args.port), latency=args.latency, jitter=args.jitter, error_rate=args.error_rate,
+        timeout_rate=args.timeout_rate, guess_after=args.guess_after, page_kb=args.page_kb,
+    )
+    print(f'Mock akinator listening on http://{args.host}:{args.port}')
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
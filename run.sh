@@ -4,8 +4,8 @@ py -m venv venv
 echo Activating virtual environment...
 call venv\Scripts\activate.bat
 echo Installing packages...
-pip install flask akinator
+pip install flask akinator waitress
 echo Running app...
-python app001.py
+python serve.py app001:app --port 5000
 echo App finished executing.
 pause
\ No newline at end of file
@@ -0,0 +1,238 @@
+# scraper_pool.py - Shared CloudScraper pool for the akinator.com hosts
+# Games lease a scraper only for the duration of an upstream call, so keep-alive
+# connections and TLS sessions are reused across games instead of rebuilt per game.
+
+import math
+import os
+import threading
+import time
+import weakref
+from collections import deque
+from contextlib import contextmanager
+from urllib.parse import urlsplit, urlunsplit
+
+from cloudscraper import create_scraper
+from requests.adapters import HTTPAdapter
+
+import metrics
+
+
+class PoolTimeout(RuntimeError):
+    """
+    Raised when no scraper becomes free before the lease timeout, or when the
+    admission queue is full or already too long to get through in time.
+
+    `retry_after` is a rough number of seconds until the host has capacity again.
+    """
+
+    def __init__(self, message, retry_after=1):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class _Waiter:
+    __slots__ = ('ready', 'scraper')
+
+    def __init__(self):
+        self.ready = threading.Event()
+        self.scraper = None  # set by release(); left None when handed a slot to create in
+
+
+class UpstreamAdapter(HTTPAdapter):
+    """Sends every request to `upstream` (e.g. a mock_akinator server) instead of its own host."""
+
+    def __init__(self, upstream, **kwargs):
+        self.upstream = urlsplit(upstream)
+        super().__init__(**kwargs)
+
+    def send(self, request, **kwargs):
+        parts = urlsplit(request.url)
+        request.url = urlunsplit((self.upstream.scheme, self.upstream.netloc, parts.path, parts.query, parts.fragment))
+        return super().send(request, **kwargs)
+
+
+class ScraperPool:
+    """
+    A bounded pool of scrapers per `{language}.akinator.com` host.
+
+    :param size: Maximum number of scrapers (and so connections) per host.
+    :param timeout: Default number of seconds to wait for a free scraper.
+    :param max_waiting: Callers allowed to queue per host before new ones are turned
+        away at once; defaults to `4 * size`.
+    :param upstream: Optional base URL every request is sent to instead, for load tests.
+    :param scraper_kwargs: Passed through to `create_scraper`.
+    """
+
+    def __init__(self, size=8, timeout=10, max_waiting=None, upstream=None, **scraper_kwargs):
+        self.size = size
+        self.timeout = timeout
+        self.max_waiting = 4 * size if max_waiting is None else max_waiting
+        self.upstream = upstream
+        self.scraper_kwargs = scraper_kwargs
+        self._idle = {}     # host -> [scraper, ...]
+        self._created = {}  # host -> number of scrapers alive for that host
+        self._waiters = {}  # host -> deque of _Waiter, served first come, first served
+        self._hold = {}     # host -> moving average of seconds a lease is held
+        self._lock = threading.Lock()
+        if hasattr(os, 'register_at_fork'):
+            after_fork = weakref.WeakMethod(self._after_fork)
+            os.register_at_fork(after_in_child=lambda: after_fork() and after_fork()())
+
+    @staticmethod
+    def host(language='en'):
+        return f'{language}.akinator.com'
+
+    def acquire(self, language='en', timeout=None):
+        host = self.host(language)
+        deadline = time.monotonic() + (self.timeout if timeout is None else timeout)
+        with self._lock:
+            waiters = self._waiters.setdefault(host, deque())
+            idle = self._idle.get(host)
+            # Nobody may jump the queue: with callers waiting, a newcomer queues behind them
+            if not waiters and idle:
+                return idle.pop()
+            if not waiters and self._created.get(host, 0) < self.size:
+                self._created[host] = self._created.get(host, 0) + 1
+                waiter = None
+            else:
+                self._admit(host, deadline)
+                waiter = _Waiter()
+                waiters.append(waiter)
+        if waiter is not None:
+            waiter.ready.wait(max(0, deadline - time.monotonic()))
+            with self._lock:
+                if not waiter.ready.is_set():
+                    waiters.remove(waiter)
+                    raise PoolTimeout(f'No free connection to {host}, try again shortly.', self._retry_after(host))
+            if waiter.scraper is not None:
+                return waiter.scraper
+            # Handed the slot of a scraper that was discarded: build a new one
+        try:
+            return self._create()
+        except Exception:
+            with self._lock:
+                self._free(host)
+            raise
+
+    def _free(self, host):
+        # Called with the lock held when a scraper is gone: its slot goes to the
+        # longest-waiting caller, who creates a new one, or back to the pool
+        waiters = self._waiters.get(host)
+        if waiters:
+            waiters.popleft().ready.set()
+        else:
+            self._created[host] -= 1
+
+    def _admit(self, host, deadline):
+        # Called with the lock held when every scraper for `host` is busy: turn the
+        # caller away now rather than after a wait that can't end in time
+        waiting = len(self._waiters.get(host, ()))
+        if waiting >= self.max_waiting:
+            raise PoolTimeout(f'Too many requests queued for {host}, try again shortly.', self._retry_after(host))
+        hold = self._hold.get(host)
+        if hold is not None and (waiting + 1) * hold / self.size > deadline - time.monotonic():
+            raise PoolTimeout(f'{host} is too busy to answer in time, try again shortly.', self._retry_after(host))
+
+    def _retry_after(self, host):
+        hold = self._hold.get(host) or 1
+        return max(1, math.ceil((len(self._waiters.get(host, ())) + 1) * hold / self.size))
+
+    def _observe(self, language, seconds):
+        host = self.host(language)
+        with self._lock:
+            hold = self._hold.get(host)
+            self._hold[host] = seconds if hold is None else hold + 0.2 * (seconds - hold)
+
+    def release(self, language, scraper):
+        host = self.host(language)
+        # Akinator identifies the game by session/signature, not cookies; keep only
+        # Cloudflare clearance so one player's cookies never leak into another game.
+        for cookie in list(scraper.cookies):
+            if not cookie.name.startswith(('cf_', '__cf')):
+                scraper.cookies.clear(cookie.domain, cookie.path, cookie.name)
+        with self._lock:
+            waiters = self._waiters.get(host)
+            if waiters:
+                # Straight to the longest-waiting caller, never through _idle
+                waiter = waiters.popleft()
+                waiter.scraper = scraper
+                waiter.ready.set()
+            else:
+                self._idle.setdefault(host, []).append(scraper)
+
+    def discard(self, language, scraper):
+        """Drop a scraper that hit a connection error instead of returning it."""
+        scraper.close()
+        with self._lock:
+            self._free(self.host(language))
+
+    @contextmanager
+    def lease(self, language='en', timeout=None):
+        scraper = self.acquire(language, timeout)
+        start = time.monotonic()
+        try:
+            yield scraper
+        except BaseException as e:
+            self._observe(language, time.monotonic() - start)
+            # akinator wraps transport errors in RuntimeError, so look at the cause too
+            if isinstance(e, OSError) or isinstance(e.__cause__, OSError):
+                self.discard(language, scraper)
+            else:
+                self.release(language, scraper)
+            raise
+        else:
+            self._observe(language, time.monotonic() - start)
+            self.release(language, scraper)
+
+    @contextmanager
+    def bind(self, client, language=None, timeout=None):
+        """Attach a leased scraper to `client` for the duration of the block."""
+        language = language or client.pool_key or 'en'
+        with self.lease(language, timeout) as scraper:
+            client.session = scraper
+            try:
+                yield client
+            finally:
+                client.session = None
+
+    def warm(self, languages=('en',), count=1):
+        """Open `count` keep-alive connections per language in the background."""
+        def run(language):
+            scrapers = []
+            try:
+                for _ in range(min(count, self.size)):
+                    scraper = self.acquire(language)
+                    scrapers.append(scraper)
+                    scraper.head(f'https://{self.host(language)}/', timeout=10)
+            except Exception:
+                pass
+            for scraper in scrapers:
+                self.release(language, scraper)
+
+        for language in languages:
+            threading.Thread(target=run, args=(language,), name=f'warm-{language}', daemon=True).start()
+
+    def close(self):
+        with self._lock:
+            idle, self._idle = self._idle, {}
+            for host, scrapers in idle.items():
+                self._created[host] -= len(scrapers)
+        for scrapers in idle.values():
+            for scraper in scrapers:
+                scraper.close()
+
+    def _after_fork(self):
+        # Scrapers created before fork() (e.g. by warm() in serve.py's preloading
+        # master) share their sockets with the parent; each worker opens its own
+        self._idle = {}
+        self._created = {}
+        self._waiters = {}
+        self._lock = threading.Lock()
+
+    def _create(self):
+        scraper = create_scraper(**self.scraper_kwargs)
+        if self.upstream:
+            adapter = UpstreamAdapter(self.upstream)
+            scraper.mount('https://', adapter)
+            scraper.mount('http://', adapter)
+        return metrics.instrument_session(scraper)
@@ -0,0 +1,106 @@
+# serve.py - Production launcher for app.py (JSON API) and app001.py (web game)
+# Uses gunicorn where it is installed (Linux/macOS) and waitress otherwise (Windows).
+# Install: pip install gunicorn    (or: pip install waitress)
+# Run: python serve.py app:app --workers 4 --threads 8
+#      python serve.py app001:app --port 5000
+#
+# With gunicorn the app and its akinator/cloudscraper imports are loaded once in the
+# master and shared copy-on-write by the forked workers, and every worker is replaced
+# gracefully after --max-requests requests (plus jitter, so they don't all restart at
+# once). The in-memory session stores are per process: run more than one worker, or
+# recycle workers, only with SESSION_REDIS_URL set, or players lose their game.
+
+import argparse
+import importlib
+import os
+import sys
+
+
+def env_int(name, default):
+    return int(os.environ.get(name, default))
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Run app.py or app001.py on a production WSGI server')
+    parser.add_argument('target', nargs='?', default=os.environ.get('WEB_APP', 'app:app'), help='module:variable of the WSGI app')
+    parser.add_argument('--host', default=os.environ.get('WEB_HOST', '0.0.0.0'))
+    parser.add_argument('--port', type=int, default=env_int('PORT', 5000))
+    parser.add_argument('--workers', type=int, default=env_int('WEB_WORKERS', 1 if not os.environ.get('SESSION_REDIS_URL') else os.cpu_count() or 1),
+                        help='processes (gunicorn only); default 1 unless SESSION_REDIS_URL is set')
+    parser.add_argument('--threads', type=int, default=env_int('WEB_THREADS', 8), help='threads per process')
+    parser.add_argument('--backlog', type=int, default=env_int('WEB_BACKLOG', 64), help='pending connections the OS queues before refusing')
+    parser.add_argument('--max-requests', type=int, default=env_int('WEB_MAX_REQUESTS', 2000 if os.environ.get('SESSION_REDIS_URL') else 0),
+                        help='recycle a worker after this many requests, 0 to never; default 0 unless SESSION_REDIS_URL is set')
+    parser.add_argument('--max-requests-jitter', type=int, default=env_int('WEB_MAX_REQUESTS_JITTER', 200))
+    parser.add_argument('--timeout', type=int, default=env_int('WEB_TIMEOUT', 60), help='seconds before a stuck worker is killed')
+    parser.add_argument('--graceful-timeout', type=int, default=env_int('WEB_GRACEFUL_TIMEOUT', 30), help='seconds a recycled worker gets to finish its requests')
+    return parser.parse_args(argv)
+
+
+def run_gunicorn(args):
+    from gunicorn.app.base import BaseApplication
+
+    class Application(BaseApplication):
+        def load_config(self):
+            options = {
+                'bind': f'{args.host}:{args.port}',
+                'workers': args.workers,
+                'threads': args.threads,
+                'worker_class': 'gthread',
+                'backlog': args.backlog,
+                'max_requests': args.max_requests,
+                'max_requests_jitter': args.max_requests_jitter,
+                'timeout': args.timeout,
+                'graceful_timeout': args.graceful_timeout,
+                'preload_app': True,
+            }
+            for key, value in options.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            return load_app(args.target)
+
+    Application().run()
+
+
+def load_app(target):
+    module, _, name = target.partition(':')
+    return getattr(importlib.import_module(module), name or 'app')
+
+
+def run_waitress(args):
+    import waitress
+
+    if args.workers > 1:
+        print('serve.py: waitress runs a single process, ignoring --workers', file=sys.stderr)
+    waitress.serve(
+        load_app(args.target),
+        host=args.host,
+        port=args.port,
+        threads=args.threads,
+        backlog=args.backlog,
+        # Connections beyond this wait in the backlog instead of piling onto the threads
+        connection_limit=args.threads * 4,
+        channel_timeout=args.timeout,
+    )
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    if args.workers > 1 and not os.environ.get('SESSION_REDIS_URL'):
+        print('serve.py: several workers without SESSION_REDIS_URL; games only work on the worker that started them',
+              file=sys.stderr)
+    try:
+        import gunicorn  # noqa: F401
+    except ImportError:
+        try:
+            import waitress  # noqa: F401
+        except ImportError:
+            sys.exit('serve.py needs gunicorn (Linux/macOS) or waitress (Windows): pip install gunicorn')
+        return run_waitress(args)
+    return run_gunicorn(args)
+
+
+if __name__ == '__main__':
+    main()
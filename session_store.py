@@ -0,0 +1,293 @@
+# session_store.py - Game session storage for app.py and app001.py
+# The Redis backend needs no extra package: it speaks RESP over TCP or a unix socket.
+
+import os
+import pickle
+import secrets
+import socket
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from urllib.parse import urlparse, parse_qs
+
+# Deletes a lock only if it still holds our token, so an expired one taken over by
+# another process is left alone
+_UNLOCK = "if redis.call('GET', KEYS[1]) == ARGV[1] then return redis.call('DEL', KEYS[1]) end return 0"
+
+
+class LockTimeout(TimeoutError):
+    """A session lock was still held by another request after the wait."""
+
+
+class SessionStore:
+    """Base class for game session backends."""
+
+    def get(self, key):
+        raise NotImplementedError
+
+    def set(self, key, value):
+        raise NotImplementedError
+
+    def add(self, key, value):
+        """Store `value` unless `key` is already there; True if it was stored."""
+        raise NotImplementedError
+
+    def delete(self, key):
+        raise NotImplementedError
+
+    def reap(self):
+        """Drop expired sessions and return how many were removed."""
+        return 0
+
+    def start_reaper(self, interval=60):
+        """Run `reap()` every `interval` seconds in a daemon thread."""
+        stop = threading.Event()
+
+        def loop():
+            while not stop.wait(interval):
+                try:
+                    self.reap()
+                except Exception:
+                    pass
+
+        def start():
+            threading.Thread(target=loop, name='session-reaper', daemon=True).start()
+
+        start()
+        if hasattr(os, 'register_at_fork'):
+            # Threads don't survive fork(), e.g. into serve.py's preloaded workers
+            os.register_at_fork(after_in_child=lambda: self._after_fork() or stop.is_set() or start())
+        return stop
+
+    def _after_fork(self):
+        pass
+
+    def __contains__(self, key):
+        return self.get(key) is not None
+
+
+class MemorySessionStore(SessionStore):
+    """
+    In-process store with idle TTL and LRU eviction.
+
+    `on_evict(value)` is called for every entry dropped by TTL or size limits
+    (not for explicit deletes), outside the store lock.
+    """
+
+    def __init__(self, ttl=900, max_size=1000, on_evict=None):
+        self.ttl = ttl
+        self.max_size = max_size
+        self.on_evict = on_evict
+        self._entries = OrderedDict()  # key -> (value, last_seen), oldest first
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        now = time.monotonic()
+        with self._lock:
+            item = self._entries.get(key)
+            if item is None:
+                return None
+            value, last_seen = item
+            if now - last_seen > self.ttl:
+                del self._entries[key]
+                expired = value
+            else:
+                self._entries[key] = (value, now)
+                self._entries.move_to_end(key)
+                return value
+        self._evicted([expired])
+        return None
+
+    def set(self, key, value):
+        with self._lock:
+            evicted = self._put(key, value)
+        self._evicted(evicted)
+
+    def add(self, key, value):
+        with self._lock:
+            item = self._entries.get(key)
+            if item is not None and time.monotonic() - item[1] <= self.ttl:
+                return False
+            evicted = self._put(key, value)
+            if item is not None:
+                evicted.append(item[0])
+        self._evicted(evicted)
+        return True
+
+    def _put(self, key, value):
+        evicted = []
+        self._entries[key] = (value, time.monotonic())
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            evicted.append(self._entries.popitem(last=False)[1][0])
+        return evicted
+
+    def delete(self, key):
+        with self._lock:
+            item = self._entries.pop(key, None)
+        return item[0] if item else None
+
+    def reap(self):
+        deadline = time.monotonic() - self.ttl
+        evicted = []
+        with self._lock:
+            while self._entries:
+                key, (value, last_seen) = next(iter(self._entries.items()))
+                if last_seen > deadline:
+                    break
+                del self._entries[key]
+                evicted.append(value)
+        self._evicted(evicted)
+        return len(evicted)
+
+    def _after_fork(self):
+        # The parent's lock may have been held by its reaper at fork time
+        self._lock = threading.Lock()
+
+    def _evicted(self, values):
+        if self.on_evict is None:
+            return
+        for value in values:
+            try:
+                self.on_evict(value)
+            except Exception:
+                pass
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class RedisSessionStore(SessionStore):
+    """
+    Store backed by Redis (or anything speaking RESP, e.g. KeyDB or Valkey).
+
+    `url` is `redis://host:port/db` or `unix:///path/to/redis.sock?db=0`.
+    Expiry is handled by Redis itself; configure `maxmemory-policy allkeys-lru`
+    on the server to get the size bound.
+    """
+
+    def __init__(self, url='redis://127.0.0.1:6379/0', ttl=900, prefix='aki:',
+                 dumps=pickle.dumps, loads=pickle.loads, timeout=5):
+        self.ttl = ttl
+        self.prefix = prefix
+        self.dumps = dumps
+        self.loads = loads
+        self.timeout = timeout
+        self._url = urlparse(url)
+        self._sock = None
+        self._file = None
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        key = self.prefix + key
+        data, _ = self._pipeline(('GET', key), ('EXPIRE', key, self.ttl))
+        return None if data is None else self.loads(data)
+
+    def set(self, key, value):
+        self._pipeline(('SET', self.prefix + key, self.dumps(value), 'EX', self.ttl))
+
+    def add(self, key, value):
+        reply, = self._pipeline(('SET', self.prefix + key, self.dumps(value), 'NX', 'EX', self.ttl))
+        return reply is not None
+
+    def delete(self, key):
+        self._pipeline(('DEL', self.prefix + key))
+
+    @contextmanager
+    def lock(self, key, timeout=120, wait=5):
+        """
+        Hold `key`'s lock, shared by every process using this Redis, until the block ends
+        or `timeout` seconds pass. Raises `LockTimeout` if it isn't free within `wait` seconds.
+        """
+        name = f'{self.prefix}lock:{key}'
+        token = secrets.token_hex(16)
+        deadline = time.monotonic() + wait
+        delay = 0.005
+        while self._pipeline(('SET', name, token, 'NX', 'PX', int(timeout * 1000)))[0] is None:
+            if time.monotonic() >= deadline:
+                raise LockTimeout(f'Session {key} is busy with another request.')
+            time.sleep(delay)
+            delay = min(delay * 2, 0.1)
+        try:
+            yield
+        finally:
+            self._pipeline(('EVAL', _UNLOCK, 1, name, token))
+
+    def _connect(self):
+        if self._url.scheme == 'unix':
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.settimeout(self.timeout)
+            sock.connect(self._url.path)
+            db = parse_qs(self._url.query).get('db', ['0'])[0]
+        else:
+            sock = socket.create_connection((self._url.hostname or '127.0.0.1', self._url.port or 6379), self.timeout)
+            db = self._url.path.lstrip('/') or '0'
+        self._sock = sock
+        self._file = sock.makefile('rb')
+        commands = []
+        if self._url.password:
+            commands.append(('AUTH', self._url.password) if not self._url.username
+                            else ('AUTH', self._url.username, self._url.password))
+        if db != '0':
+            commands.append(('SELECT', db))
+        if commands:
+            self._send(commands)
+
+    def _close(self):
+        for item in (self._file, self._sock):
+            try:
+                if item is not None:
+                    item.close()
+            except OSError:
+                pass
+        self._sock = self._file = None
+
+    def _pipeline(self, *commands):
+        with self._lock:
+            for attempt in (0, 1):
+                try:
+                    if self._sock is None:
+                        self._connect()
+                    return self._send(commands)
+                except (OSError, EOFError):
+                    self._close()
+                    if attempt:
+                        raise
+
+    def _send(self, commands):
+        out = bytearray()
+        for command in commands:
+            out += b'*%d\r\n' % len(command)
+            for arg in command:
+                if not isinstance(arg, bytes):
+                    arg = str(arg).encode()
+                out += b'$%d\r\n%s\r\n' % (len(arg), arg)
+        self._sock.sendall(out)
+        # Read every reply before raising so the connection stays in sync
+        replies = [self._read() for _ in commands]
+        for reply in replies:
+            if isinstance(reply, RuntimeError):
+                raise reply
+        return replies
+
+    def _read(self):
+        line = self._file.readline()
+        if not line:
+            raise EOFError('Connection closed by server')
+        kind, rest = line[:1], line[1:-2]
+        if kind == b'+':
+            return rest
+        if kind == b'-':
+            return RuntimeError(rest.decode())
+        if kind == b':':
+            return int(rest)
+        if kind == b'$':
+            size = int(rest)
+            if size < 0:
+                return None
+            data = self._file.read(size + 2)
+            return data[:-2]
+        if kind == b'*':
+            return [self._read() for _ in range(int(rest))]
+        raise RuntimeError(f'Unexpected reply from server: {line!r}')
@@ -0,0 +1,76 @@
+# template_registry.py - Named Jinja templates kept as Python strings, compiled once
+# render_template_string() re-lexes, re-parses and re-compiles its source on every
+# call. Templates registered here are compiled when they are registered and the
+# Template object is reused; with a bytecode cache directory the compiled code is
+# also kept on disk, so a restart (including the debug reloader's) skips the compile.
+# That directory's contents are loaded as code, so it must be private to this user.
+
+import os
+import stat
+
+from flask import render_template
+from jinja2 import BaseLoader, ChoiceLoader, FileSystemBytecodeCache, TemplateNotFound
+
+
+class _RegistryLoader(BaseLoader):
+    def __init__(self, registry):
+        self.registry = registry
+
+    def get_source(self, environment, name):
+        entry = self.registry.sources.get(name)
+        if entry is None:
+            raise TemplateNotFound(name)
+        source, filename = entry
+        # Up to date for as long as nobody registers a new source under the name
+        return source, filename, lambda: self.registry.sources.get(name) is entry
+
+    def list_templates(self):
+        return sorted(self.registry.sources)
+
+
+def _private_dir(path):
+    # Anyone who can write here can run code in the app; same rule as jinja2's default cache dir
+    os.makedirs(path, mode=0o700, exist_ok=True)
+    if not hasattr(os, 'getuid'):
+        return path
+    info = os.lstat(path)
+    if not stat.S_ISDIR(info.st_mode) or info.st_uid != os.getuid() or stat.S_IMODE(info.st_mode) != 0o700:
+        raise RuntimeError(f'Template cache directory {path!r} must be a directory owned by this user with mode 0700.')
+    return path
+
+
+class TemplateRegistry:
+    """
+    Compiles named in-module templates once and renders them like `render_template`.
+
+    Registered names are looked up before the app's own templates folder. In debug mode
+    (or with TEMPLATES_AUTO_RELOAD) the compiled template is re-checked on every render,
+    so registering a new source under a name takes effect immediately.
+
+    :param app: The Flask app whose Jinja environment is used.
+    :param cache_dir: Directory for the on-disk bytecode cache, or None for no disk cache.
+        It is created with mode 0700 and refused if another user owns it or could write to it.
+    """
+
+    def __init__(self, app, cache_dir=None):
+        self.app = app
+        self.sources = {}    # name -> (source, filename)
+        self.templates = {}  # name -> compiled Template
+        env = app.jinja_env
+        env.loader = ChoiceLoader([_RegistryLoader(self), env.loader])
+        if cache_dir:
+            env.bytecode_cache = FileSystemBytecodeCache(_private_dir(cache_dir))
+
+    def register(self, name, source, filename=None):
+        """Add (or replace) the template `name` and compile it now."""
+        self.sources[name] = (source, filename)
+        self.templates[name] = self.app.jinja_env.get_template(name)
+        return self.templates[name]
+
+    def get(self, name):
+        if self.app.debug or self.app.config['TEMPLATES_AUTO_RELOAD']:
+            return self.app.jinja_env.get_template(name)
+        return self.templates[name]
+
+    def render(self, name, /, **context):
+        return render_template(self.get(name), **context)
@@ -0,0 +1,230 @@
+# ua_cache.py - Process-wide index of cloudscraper's browsers.json
+# install() replaces User_Agent.loadUserAgent with a lookup into this index, so
+# building a scraper no longer opens and re-parses the 1.2 MB browsers.json.
+# The parsed index is also kept as a marshal file, which loads several times faster
+# than the JSON on the next start. It decides the fingerprint and ciphers sent to
+# akinator.com, so it lives in a directory private to this user (mode 0700, checked
+# before use) and is checked for shape once loaded; otherwise browsers.json is parsed.
+
+import json
+import marshal
+import os
+import random
+import re
+import ssl
+import stat
+import sys
+import tempfile
+import threading
+from collections import OrderedDict
+
+from cloudscraper import user_agent as _ua
+
+SOURCE = os.path.join(os.path.dirname(_ua.__file__), 'browsers.json')
+CACHE_DIR = os.environ.get('UA_CACHE_DIR') or os.path.join(
+    tempfile.gettempdir(), f'akinator-ua-{os.getuid()}' if hasattr(os, 'getuid') else 'akinator-ua')
+FORMAT = 1
+
+PLATFORMS = ('linux', 'windows', 'darwin', 'android', 'ios')
+BROWSERS = ('chrome', 'firefox')
+
+_index = None
+_lock = threading.Lock()
+_random = random.SystemRandom()
+_original = _ua.User_Agent.loadUserAgent
+
+
+def _build(data):
+    agents = data['user_agents']
+    index = {
+        'headers': {browser: tuple(headers.items()) for browser, headers in data['headers'].items()},
+        'cipherSuite': {browser: tuple(suite) for browser, suite in data['cipherSuite'].items()},
+        'agents': {},
+        'joined': [],
+    }
+    # Same merge order as User_Agent.filterAgents: mobile first, then desktop
+    for platform in PLATFORMS:
+        for desktop, mobile in ((True, True), (True, False), (False, True)):
+            filtered = {}
+            if mobile and agents['mobile'].get(platform):
+                filtered.update(agents['mobile'][platform])
+            if desktop and agents['desktop'].get(platform):
+                filtered.update(agents['desktop'][platform])
+            index['agents'][(platform, desktop, mobile)] = {
+                browser: tuple(values) for browser, values in filtered.items() if values
+            }
+    for device in agents:
+        for platform in agents[device]:
+            for browser, values in agents[device][platform].items():
+                index['joined'].append((browser, ' '.join(values)))
+    return index
+
+
+def _valid(index):
+    # Exactly what _build() makes, so a damaged or foreign file is never used
+    def strings(values):
+        return isinstance(values, tuple) and all(isinstance(value, str) for value in values)
+
+    keys = {(platform, desktop, mobile) for platform in PLATFORMS
+            for desktop, mobile in ((True, True), (True, False), (False, True))}
+    try:
+        return (
+            type(index) is dict and set(index) == {'headers', 'cipherSuite', 'agents', 'joined'}
+            and all(isinstance(headers, tuple) and all(
+                        isinstance(pair, tuple) and len(pair) == 2 and isinstance(pair[0], str)
+                        and (pair[1] is None or isinstance(pair[1], str)) for pair in headers)
+                    for headers in index['headers'].values())
+            and all(strings(suite) for suite in index['cipherSuite'].values())
+            and type(index['agents']) is dict and set(index['agents']) == keys
+            and all(strings(agents) for filtered in index['agents'].values() for agents in filtered.values())
+            and all(len(pair) == 2 and strings(pair) for pair in index['joined'])
+        )
+    except (AttributeError, TypeError):
+        return False
+
+
+def _cache_dir():
+    # None unless CACHE_DIR is a directory only this user can write to
+    try:
+        os.makedirs(CACHE_DIR, mode=0o700, exist_ok=True)
+        info = os.lstat(CACHE_DIR)
+    except OSError:
+        return None
+    if not stat.S_ISDIR(info.st_mode):
+        return None
+    if hasattr(os, 'getuid') and (info.st_uid != os.getuid() or stat.S_IMODE(info.st_mode) & 0o077):
+        return None
+    return CACHE_DIR
+
+
+def _cache_path(directory):
+    source = os.stat(SOURCE)
+    return os.path.join(directory, f'cloudscraper-ua-{FORMAT}-{source.st_size}-{int(source.st_mtime)}.marshal')
+
+
+def _load():
+    directory = _cache_dir()
+    path = _cache_path(directory) if directory else None
+    if path:
+        try:
+            with open(path, 'rb') as fp:
+                index = marshal.load(fp)
+            if _valid(index):
+                return index
+        except (OSError, EOFError, ValueError, TypeError):
+            pass
+
+    with open(SOURCE, 'r') as fp:
+        index = _build(json.load(fp))
+
+    if path:
+        try:
+            fd, tmp = tempfile.mkstemp(dir=directory, suffix='.tmp')
+            with os.fdopen(fd, 'wb') as fp:
+                marshal.dump(index, fp)
+            os.replace(tmp, path)
+        except OSError:
+            pass
+    return index
+
+
+def index():
+    """Return the parsed user agent index, building it on first use."""
+    global _index
+    if _index is None:
+        with _lock:
+            if _index is None:
+                _index = _load()
+    return _index
+
+
+def _match_custom(custom):
+    pattern = re.compile(re.escape(custom))
+    for browser, joined in index()['joined']:
+        if pattern.search(joined):
+            return browser
+    return None
+
+
+def loadUserAgent(self, *args, **kwargs):
+    """Drop-in replacement for `User_Agent.loadUserAgent` backed by `index()`."""
+    self.browser = kwargs.pop('browser', None)
+
+    self.platforms = list(PLATFORMS)
+    self.browsers = list(BROWSERS)
+
+    if isinstance(self.browser, dict):
+        self.custom = self.browser.get('custom', None)
+        self.platform = self.browser.get('platform', None)
+        self.desktop = self.browser.get('desktop', True)
+        self.mobile = self.browser.get('mobile', True)
+        self.browser = self.browser.get('browser', None)
+    else:
+        self.custom = kwargs.pop('custom', None)
+        self.platform = kwargs.pop('platform', None)
+        self.desktop = kwargs.pop('desktop', True)
+        self.mobile = kwargs.pop('mobile', True)
+
+    if not self.desktop and not self.mobile:
+        sys.tracebacklimit = 0
+        raise RuntimeError("Sorry you can't have mobile and desktop disabled at the same time.")
+
+    data = index()
+
+    if self.custom:
+        browser = _match_custom(self.custom)
+        if browser:
+            self.headers = OrderedDict(data['headers'][browser])
+            self.headers['User-Agent'] = self.custom
+            self.cipherSuite = list(data['cipherSuite'][browser])
+        else:
+            self.cipherSuite = [
+                ssl._DEFAULT_CIPHERS,
+                '!AES128-SHA',
+                '!ECDHE-RSA-AES256-SHA',
+            ]
+            self.headers = OrderedDict([
+                ('User-Agent', self.custom),
+                ('Accept', 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,image/apng,*/*;q=0.8'),
+                ('Accept-Language', 'en-US,en;q=0.9'),
+                ('Accept-Encoding', 'gzip, deflate, br')
+            ])
+    else:
+        if self.browser and self.browser not in self.browsers:
+            sys.tracebacklimit = 0
+            raise RuntimeError(f'Sorry "{self.browser}" browser is not valid, valid browsers are [{", ".join(self.browsers)}].')
+
+        if not self.platform:
+            self.platform = _random.choice(self.platforms)
+
+        if self.platform not in self.platforms:
+            sys.tracebacklimit = 0
+            raise RuntimeError(f'Sorry the platform "{self.platform}" is not valid, valid platforms are [{", ".join(self.platforms)}]')
+
+        filtered = data['agents'][(self.platform, bool(self.desktop), bool(self.mobile))]
+
+        if not self.browser:
+            self.browser = _random.choice(list(filtered))
+
+        if not filtered.get(self.browser):
+            sys.tracebacklimit = 0
+            raise RuntimeError(f'Sorry "{self.browser}" browser was not found with a platform of "{self.platform}".')
+
+        self.cipherSuite = list(data['cipherSuite'][self.browser])
+        self.headers = OrderedDict(data['headers'][self.browser])
+        self.headers['User-Agent'] = _random.choice(filtered[self.browser])
+
+    if not kwargs.get('allow_brotli', False) and 'br' in self.headers['Accept-Encoding']:
+        self.headers['Accept-Encoding'] = ','.join([
+            encoding for encoding in self.headers['Accept-Encoding'].split(',') if encoding.strip() != 'br'
+        ]).strip()
+
+
+def install():
+    """Route every new `CloudScraper` through the cached index."""
+    index()
+    _ua.User_Agent.loadUserAgent = loadUserAgent
+
+
+def uninstall():
+    _ua.User_Agent.loadUserAgent = _original
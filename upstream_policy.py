@@ -0,0 +1,147 @@
+# upstream_policy.py - Timeouts and retries for akinator.com calls
+# akinator.Client posts without a timeout, so a hung connection holds a worker
+# forever. UpstreamPolicy gives every call a (connect, read) timeout and retries
+# only what is safe to send twice: failures to open a connection (nothing was sent)
+# and 502/503 answers (akinator.com never got the request). A read timeout or a
+# connection dropped mid-response is not retried, since akinator may already have
+# moved the game on. Retries wait with full-jitter exponential backoff and draw on a
+# RetryBudget shared by every client, so they can't multiply an upstream outage.
+
+import asyncio
+import os
+import random
+import threading
+import time
+
+from requests.exceptions import ConnectTimeout, RequestException
+from urllib3.exceptions import NewConnectionError
+
+import async_transport
+
+
+class RetryBudget:
+    """
+    Allows retries up to `ratio` of the calls made, plus `min_per_second` so a
+    quiet process can still retry, holding at most `burst` unused retries.
+    """
+
+    def __init__(self, ratio=0.1, min_per_second=1.0, burst=10):
+        self.ratio = ratio
+        self.min_per_second = min_per_second
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, amount=0.0):
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + amount + (now - self._updated) * self.min_per_second)
+        self._updated = now
+
+    def deposit(self):
+        """Record a call; each one earns `ratio` of a retry."""
+        with self._lock:
+            self._refill(self.ratio)
+
+    def withdraw(self):
+        """Take one retry; False if the budget is spent."""
+        with self._lock:
+            self._refill()
+            if self._tokens < 1:
+                return False
+            self._tokens -= 1
+            return True
+
+
+# Shared by every policy that isn't given its own
+BUDGET = RetryBudget()
+
+
+def connect_failed(error):
+    """True if `error` means no connection was made, so the request was never sent."""
+    if isinstance(error, (ConnectTimeout, async_transport.NewConnectionError)):
+        return True
+    reason = getattr(error.args[0], 'reason', None) if error.args else None
+    return isinstance(reason, NewConnectionError)
+
+
+class UpstreamPolicy:
+    """
+    Timeouts and retry rules for one kind of akinator.com call.
+
+    :param connect_timeout: Seconds to open a connection (including TLS).
+    :param read_timeout: Seconds to wait for each read of the response.
+    :param retries: Retries after the first attempt, at most.
+    :param backoff: Base delay; retry `n` waits a random 0..backoff * 2**n seconds.
+    :param max_backoff: Cap on a single delay.
+    :param retry_statuses: Response statuses that are retried.
+    :param budget: The `RetryBudget` to draw on; the process-wide `BUDGET` by default.
+    """
+
+    def __init__(self, connect_timeout=5, read_timeout=20, retries=2, backoff=0.25, max_backoff=2.0,
+                 retry_statuses=(502, 503), budget=None):
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.retry_statuses = frozenset(retry_statuses)
+        self.budget = BUDGET if budget is None else budget
+
+    @property
+    def timeout(self):
+        return self.connect_timeout, self.read_timeout
+
+    def delay(self, attempt):
+        return random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
+
+    def _retry(self, attempt, error=None, response=None):
+        if attempt >= self.retries:
+            return False
+        if error is not None and not connect_failed(error):
+            return False
+        if response is not None and response.status_code not in self.retry_statuses:
+            return False
+        return self.budget.withdraw()
+
+    def post(self, session, url, **kwargs):
+        kwargs.setdefault('timeout', self.timeout)
+        self.budget.deposit()
+        attempt = 0
+        while True:
+            try:
+                response = session.post(url, **kwargs)
+            except RequestException as e:
+                if not self._retry(attempt, error=e):
+                    raise
+            else:
+                if not self._retry(attempt, response=response):
+                    return response
+                response.close()
+            time.sleep(self.delay(attempt))
+            attempt += 1
+
+    async def post_async(self, session, url, **kwargs):
+        kwargs.setdefault('timeout', self.timeout)
+        self.budget.deposit()
+        attempt = 0
+        while True:
+            try:
+                response = await session.post(url, **kwargs)
+            except RequestException as e:
+                if not self._retry(attempt, error=e):
+                    raise
+            else:
+                if not self._retry(attempt, response=response):
+                    return response
+            await asyncio.sleep(self.delay(attempt))
+            attempt += 1
+
+
+# Used by akiclient.Client/AsyncClient unless they are given their own
+DEFAULT_POLICY = UpstreamPolicy(
+    connect_timeout=float(os.environ.get('AKINATOR_CONNECT_TIMEOUT', 5)),
+    read_timeout=float(os.environ.get('AKINATOR_READ_TIMEOUT', 20)),
+    retries=int(os.environ.get('AKINATOR_RETRIES', 2)),
+)
+